@@ -0,0 +1,204 @@
+"""
+Throughput and peak memory of the parsers on a synthetic archive:
+    python -m mirospy.benchmarks --files 500 --output bench.json
+    python -m mirospy.benchmarks --baseline bench.json
+Exits with status 1 when a case is slower or uses more memory than the
+baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from ..parsers import df022, df037, df038
+from ..stats import integrated_stats
+from ..swan import export_df038
+from .synthetic import make_archive
+
+
+def _cases(files, nswan, scratch):
+    """
+    name -> setup returning (function, files processed, bytes read), only
+    the cases that run pay for their setup; directories the setups create
+    are appended to scratch
+    """
+    size = lambda names: sum(os.path.getsize(f) for f in names)
+
+    def output_dir():
+        scratch.append(tempfile.mkdtemp())
+        return scratch[-1]
+
+    def parse(parser, code):
+        # every file of a format, one parser call each
+        return lambda: (lambda: [parser(f) for f in files[code]],
+                        len(files[code]), size(files[code]))
+
+    def load(loader, code):
+        # every file of a format in one call
+        return lambda: (lambda: loader(files[code]),
+                        len(files[code]), size(files[code]))
+
+    def df022_header_only():
+        return (lambda: [df022.ParseDF022(f, header_only=True) for f in files['DF022']],
+                len(files['DF022']), None)
+
+    def df022_get_param():
+        parsed = [df022.ParseDF022(f) for f in files['DF022']]
+        params = list(df022.PARAM_INDEX)
+
+        def get_param():
+            for data in parsed:
+                for param in params:
+                    data.get_param(param)
+        return get_param, len(parsed), None
+
+    def df022_get_params():
+        parsed = [df022.ParseDF022(f) for f in files['DF022']]
+        params = list(df022.PARAM_INDEX)
+
+        def get_params():
+            for data in parsed:
+                data.get_params(params)
+        return get_params, len(parsed), None
+
+    def df038_stats():
+        efth = df038.load_df038(files['DF038'])
+        return lambda: integrated_stats(efth), efth.sizes['time'], None
+
+    def df038_swan():
+        swan_dir = output_dir()
+
+        def swan():
+            for ifile, filename in enumerate(files['DF038'][:nswan]):
+                df038.ParseDF038(filename).shell2swan(
+                    os.path.join(swan_dir, '%d.spec' % ifile))
+        return swan, nswan, size(files['DF038'][:nswan])
+
+    def df038_export_swan():
+        filename = os.path.join(output_dir(), 'all.spec')
+        return (lambda: export_df038(files['DF038'], filename),
+                len(files['DF038']), size(files['DF038']))
+
+    return {
+        'df022_parse': parse(df022.ParseDF022, 'DF022'),
+        'df022_header_only': df022_header_only,
+        'df022_get_param': df022_get_param,
+        'df022_get_params': df022_get_params,
+        'df022_load': load(df022.load_df022, 'DF022'),
+        'df037_parse': parse(df037.ParseDF037, 'DF037'),
+        'df038_parse': parse(lambda f: df038.ParseDF038(f).spec2d, 'DF038'),
+        'df038_load': load(df038.load_df038, 'DF038'),
+        'df038_stats': df038_stats,
+        'df038_swan': df038_swan,
+        'df038_export_swan': df038_export_swan,
+    }
+
+def measure(func, nfiles, nbytes, repeat=3):
+    """Best wall time of repeat calls, then peak traced memory of one call"""
+    seconds = min(_timed(func) for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'files': nfiles,
+        'seconds': seconds,
+        'files_per_s': nfiles/seconds if seconds else None,
+        'mb_per_s': nbytes/seconds/1e6 if nbytes is not None and seconds else None,
+        'peak_bytes': peak,
+    }
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter()-start
+
+def run_suite(nfiles=200, records=1, nfreq=32, ndirs=36, nswan=20, repeat=3,
+              cases=None, directory=None):
+    """Results of every (or the selected) benchmark case as a dictionary"""
+    tmp = directory is None
+    directory = tempfile.mkdtemp() if tmp else directory
+    scratch = []
+    try:
+        files = make_archive(directory, nfiles, records, nfreq, ndirs)
+        all_cases = _cases(files, min(nswan, nfiles), scratch)
+        results = {}
+        for name, setup in sorted(all_cases.items()):
+            if cases and name not in cases:
+                continue
+            func, ncount, nbytes = setup()
+            results[name] = measure(func, ncount, nbytes, repeat)
+    finally:
+        if tmp:
+            shutil.rmtree(directory, ignore_errors=True)
+        for path in scratch:
+            shutil.rmtree(path, ignore_errors=True)
+    return {
+        'meta': {'files': nfiles, 'records': records, 'nfreq': nfreq,
+                 'ndirs': ndirs, 'python': platform.python_version(),
+                 'numpy': np.__version__, 'machine': platform.machine()},
+        'results': results,
+    }
+
+def compare(current, baseline, tolerance=0.25):
+    """Messages for cases slower or using more memory than the baseline"""
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if base['files_per_s'] and result['files_per_s'] is not None and \
+           result['files_per_s'] < base['files_per_s']*(1-tolerance):
+            regressions.append('%s: %.1f files/s, baseline %.1f'
+                               % (name, result['files_per_s'], base['files_per_s']))
+        if result['peak_bytes'] > base['peak_bytes']*(1+tolerance):
+            regressions.append('%s: peak %d bytes, baseline %d'
+                               % (name, result['peak_bytes'], base['peak_bytes']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark mirospy parsers')
+    parser.add_argument('--files', type=int, default=200,
+                        help='synthetic files per format')
+    parser.add_argument('--records', type=int, default=1,
+                        help='records per DF037/DF038 file')
+    parser.add_argument('--nfreq', type=int, default=32)
+    parser.add_argument('--ndirs', type=int, default=36)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--case', dest='cases', action='append',
+                        help='only run this case')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown or memory growth')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.files, args.records, args.nfreq, args.ndirs,
+                        repeat=args.repeat, cases=args.cases)
+    for name, result in sorted(results['results'].items()):
+        print('%-20s %10.1f files/s %8s MB/s %12d peak bytes'
+              % (name, result['files_per_s'] or 0,
+                 '%.1f' % result['mb_per_s'] if result['mb_per_s'] else '-',
+                 result['peak_bytes']))
+    if args.output:
+        with open(args.output, 'w') as openfile:
+            json.dump(results, openfile, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as openfile:
+            regressions = compare(results, json.load(openfile), args.tolerance)
+        for message in regressions:
+            print('REGRESSION '+message)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthetic Miros files with the layout of the real ones, for benchmarks:
+    make_archive('/tmp/archive', nfiles=1000)
+"""
+import datetime
+import os
+
+import numpy as np
+
+from ..parsers.df022 import BLOCKS_METADATA
+
+DF022_INSTANCES = {'CL': 1, 'CV': 2, 'MD': 1, 'PT': 1, 'PW': 2, 'ST': 1,
+                   'TH': 1, 'VB': 1, 'VG': 1, 'VH': 1, 'VM': 4, 'VN': 4,
+                   'WA': 2, 'WI': 1, 'WM': 2}
+# values per instance of the blocks without params in BLOCKS_METADATA, as
+# in the sample MIR_All_NOW.DF022
+DF022_WIDTHS = {'CV': 15, 'MD': 1, 'ST': 1, 'WI': 23}
+MISSING_VALUES = ('-999.99', '-999.88', '-999.77')
+DF037_CODES = ['SDp1', 'Hm0', 'Hmax', 'Htmax', 'Tp1', 'Tp2', 'Tpc', 'Ts',
+               'Tm0-1', 'Tm0-2', 'Tm02', 'Tm01', 'Tmax', 'Thmax', 'Tm24',
+               'Dp1-t', 'Dm1-t', 'SPR1', 'Dpt-t', 'Dmt-t', 'SPRt', 'Y', 'SK',
+               'Sm02', 'm0', 'm1', 'm2', 'm3', 'm4', 'm-1', 'm-2', 'Vp1',
+               'Lp1', 'Cg1', 'Dp2-t', 'Dm2-t', 'SPR2', 'Dp1-r', 'Dm1-r',
+               'Dp2-r', 'Dm2-r', 'Dpt-r', 'Dmt-r']
+DF037_UNITS = (['m2/Hz']+['m']*3+['s']*11+['deg']*6+['//']*3+
+               ['m2', 'm2/s1', 'm2/s2', 'm2/s3', 'm2/s4', 'm2s', 'm2s2',
+                'm/s', 'm', 'm/s']+['deg']*9)
+START = datetime.datetime(2017, 3, 22)
+
+
+def _lines(path, lines):
+    with open(path, 'w', newline='') as openfile:
+        openfile.write('\r\n'.join(lines)+'\r\n')
+
+def write_df022(path, time, site='1095', instances=DF022_INSTANCES,
+                missing_fraction=0.1, rng=None):
+    """
+    DF022 file with every block of instances, random values and the three
+    missing value sentinels
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    lines = ['!!!!', 'DF022    ', '%-20s' % site, time.strftime('%d-%m-%Y'),
+             time.strftime('%H:%M')]
+    for block_id in sorted(instances):
+        nparams = DF022_WIDTHS.get(block_id) or \
+            len(BLOCKS_METADATA['params'][block_id])
+        for instance in range(1, instances[block_id]+1):
+            values = rng.uniform(0, 360, nparams)
+            if block_id == 'VB':
+                # degmin offset by 180 degrees
+                values = np.array([24146.88, 18250.00])
+            elif block_id == 'WA':
+                values[:2] = 69.0, 0.13
+            text = ['%8.2f' % v for v in values]
+            for imissing in np.flatnonzero(rng.random(nparams) < missing_fraction):
+                text[imissing] = '%8s' % rng.choice(MISSING_VALUES)
+            lines.append('\f%s%d-%03d' % (block_id, instance, nparams+1))
+            lines += text
+    lines.append('\f$$$$$$$')
+    _lines(path, lines)
+
+def spectrum(nfreq, ndirs, fp=0.1, dp=270., hs=2.):
+    """(freq, dir) Pierson-Moskowitz spectrum with a cos**2 spread"""
+    freqs = 0.01*np.arange(nfreq)
+    dirs = np.arange(0, 360, 360./ndirs)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        ef = freqs**-5*np.exp(-1.25*(fp/freqs)**4)
+    ef[~np.isfinite(ef)] = 0
+    spread = np.cos(np.radians(dirs-dp)/2)**2
+    efth = ef[:, None]*spread[None, :]
+    total = efth.sum()*0.01*(360./ndirs)
+    return efth*(hs/4.)**2/total if total else efth
+
+def write_df038(path, times, nfreq=32, ndirs=36, site='WVX', rng=None):
+    """DF038 file with one DATA record per time"""
+    rng = np.random.default_rng() if rng is None else rng
+    lines = ['[GENERAL]', 'Miros_Format_No=DF-038', 'Revision_No=6',
+             'Site_Name=Synthetic', 'Site_Id=%s' % site,
+             'Sensor_Name=Miros Wavex', 'Sensor_Id=Wavex',
+             'Sampling_Interval=00:01:00', '',
+             '[PARAMETER_IDENTIFIER]', 'Direction_Convention=Approaching',
+             'Direction_Relative_To=Heading', 'Direction_Offset=000',
+             'Number_Of_Directions=%03d' % ndirs,
+             'Number_Of_Frequencies=%03d' % nfreq,
+             'Start_Frequency=0.0000000', 'Frequency_Resolution=0.0100000',
+             'Number_Of_Status_Codes=8', 'Heading=Yes', 'Position=Yes', '',
+             '[SENSOR_INFO]', 'Averaging_Period=00:20:00',
+             'Sampling_Period=00:01:17', '', '[DATA]']
+    for time in times:
+        efth = spectrum(nfreq, ndirs, fp=rng.uniform(0.07, 0.2),
+                        dp=rng.uniform(0, 360), hs=rng.uniform(0.5, 6))
+        # file layout: 1D spectrum then one block of frequencies per direction
+        values = np.concatenate([efth.sum(axis=1), efth.T.ravel()])
+        lines.append(time.strftime('%Y-%m-%d %H:%M:%S Z ')+
+                     ' '.join('%.3e' % v for v in values)+
+                     ' 1------- 319 000 6146.88,N 00249.99,E')
+    _lines(path, lines)
+
+def write_df037(path, times, site='WVX', rng=None):
+    """DF037 file with one DATA line per time"""
+    rng = np.random.default_rng() if rng is None else rng
+    ncodes = len(DF037_CODES)
+    row = lambda key, fields: '%-25s' % (key+'=')+''.join('%13s' % f for f in fields)
+    lines = ['[GENERAL]', 'Miros_Format_No=DF-037', 'Revision_No=6',
+             'No_Of_Parameters=%d' % ncodes, '', '[PARAMETER_IDENTIFIER]',
+             row('Site_Id', [site]*ncodes)+' STATUS',
+             row('Sensor_Id', ['WM1 sensor']*ncodes),
+             row('Block_Id', ['WM1']*ncodes),
+             row('Parameter_No', range(2, ncodes+2)),
+             row('Parameter_Code', DF037_CODES),
+             row('Parameter_Unit', DF037_UNITS), '', '[DATA]']
+    for time in times:
+        lines.append(time.strftime('%Y-%m-%d %H:%M:%S.000 Z ')+
+                     ' '.join('%.7E' % v for v in rng.uniform(0, 360, ncodes))+
+                     ' '+'1'*ncodes)
+    _lines(path, lines)
+
+def make_archive(directory, nfiles=100, records=1, nfreq=32, ndirs=36, seed=0):
+    """
+    nfiles one-minute DF022, DF037 and DF038 files below directory, one
+    subdirectory per minute; DF037/DF038 files hold records records each.
+    Returns {format code: [filenames]}.
+    """
+    rng = np.random.default_rng(seed)
+    files = {'DF022': [], 'DF037': [], 'DF038': []}
+    for ifile in range(nfiles):
+        time = START+datetime.timedelta(minutes=ifile*records)
+        times = [time+datetime.timedelta(minutes=i) for i in range(records)]
+        subdir = os.path.join(directory, time.strftime('%Y%m%d%H%M'))
+        if not os.path.isdir(subdir):
+            os.makedirs(subdir)
+        path = os.path.join(subdir, 'MIR_All_NOW.DF022')
+        write_df022(path, time, rng=rng)
+        files['DF022'].append(path)
+        path = os.path.join(subdir, 'MIR_WM1_NOW.DF037')
+        write_df037(path, times, rng=rng)
+        files['DF037'].append(path)
+        path = os.path.join(subdir, 'MIR_LD1_NOW.DF038')
+        write_df038(path, times, nfreq, ndirs, rng=rng)
+        files['DF038'].append(path)
+    return files
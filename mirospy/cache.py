@@ -0,0 +1,155 @@
+"""
+Opt-in on-disk cache of decoded parser arrays:
+    cache = ParseCache('/scratch/mirospy-cache', max_size=20*2**30)
+    data = ParseDF022(filename, cache=cache)
+    efth = load_df038(files, cache=cache)
+Entries are keyed on the absolute path, mtime and size of the source
+file (or of every file of a batch) and hold the arrays back to back in one
+binary file described by a JSON metadata file. Warm loads memory-map that
+file instead of decoding the text again.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import profiling
+
+META_FILE = 'meta.json'
+DATA_FILE = 'arrays.bin'
+ALIGN = 64
+
+
+class ParseCache(object):
+    """
+    Directory of cache entries with a total size limit:
+    - directory: created if it does not exist
+    - max_size: bytes kept on disk, least recently used entries are
+      removed once it is exceeded
+    """
+    def __init__(self, directory, max_size=2**30):
+        super(ParseCache, self).__init__()
+        self.directory = directory
+        self.max_size = max_size
+        self._total = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _entry(self, sources, kind):
+        # sources: one filename or a sequence of them (e.g. a stacked batch)
+        if isinstance(sources, str):
+            sources = [sources]
+        digest = hashlib.sha1(kind.encode('utf-8'))
+        for filename in sources:
+            stat = os.stat(filename)
+            digest.update(('\0%s\0%d\0%d' % (os.path.abspath(filename),
+                                              stat.st_mtime_ns,
+                                              stat.st_size)).encode('utf-8'))
+        return os.path.join(self.directory, digest.hexdigest())
+
+    def get(self, sources, kind):
+        """(meta, {name: read-only array}) for sources, None on a miss"""
+        with profiling.stage('cache.get') as stage:
+            cached = self._get(sources, kind)
+            if cached is not None:
+                stage.bytes = sum(a.nbytes for a in cached[1].values())
+        return cached
+
+    def _get(self, sources, kind):
+        try:
+            entry = self._entry(sources, kind)
+            with open(os.path.join(entry, META_FILE)) as openfile:
+                stored = json.load(openfile)
+            if stored['size']:
+                buffer = np.memmap(os.path.join(entry, DATA_FILE),
+                                   dtype=np.uint8, mode='r')
+            else:
+                buffer = b''
+        except (OSError, ValueError):
+            return None
+        arrays = {}
+        for name, (dtype, shape, offset) in stored['arrays'].items():
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype),
+                                      buffer=buffer, offset=offset)
+        # directory mtime is the LRU clock
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return stored['meta'], arrays
+
+    def put(self, sources, kind, meta, arrays):
+        """Store JSON-serialisable meta and {name: array} for sources"""
+        with profiling.stage('cache.put') as stage:
+            stage.bytes = self._put(sources, kind, meta, arrays)
+
+    def _put(self, sources, kind, meta, arrays):
+        # bytes written
+        try:
+            entry = self._entry(sources, kind)
+        except OSError:
+            return 0
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = (array.dtype.str, list(array.shape), offset)
+            offset += -(-array.nbytes//ALIGN)*ALIGN
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        try:
+            with open(os.path.join(tmp, DATA_FILE), 'wb') as openfile:
+                for name, array in arrays.items():
+                    openfile.seek(layout[name][2])
+                    openfile.write(np.ascontiguousarray(array).tobytes())
+                openfile.truncate(offset)
+            with open(os.path.join(tmp, META_FILE), 'w') as openfile:
+                json.dump({'meta': meta, 'arrays': layout, 'size': offset},
+                          openfile)
+            os.rename(tmp, entry)
+        except OSError:
+            # another process stored the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return 0
+        if self._total is not None:
+            self._total += offset
+        if self.total_size() > self.max_size:
+            self.evict()
+        return offset
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, f))
+                           for f in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), size, entry))
+            except OSError:
+                continue
+        return entries
+
+    def total_size(self):
+        """Bytes used by the cache, scanned once and then tracked"""
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._entries())
+        return self._total
+
+    def evict(self, max_size=None):
+        """Remove least recently used entries down to 90% of max_size"""
+        target = 0.9*(self.max_size if max_size is None else max_size)
+        # rescan, other processes may share the directory
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        self._total = total
+
+    def clear(self):
+        self.evict(0)
@@ -0,0 +1,143 @@
+"""
+Derived variables of stacked DF022 datasets, computed on first request:
+    derived = Derived(load_df022(files))
+    lat = derived['Latitude decimal']
+    ds = derived.to_dataset(['Latitude decimal', 'Longitude decimal'])
+Variables are declared in DERIVED from blocks_metadata parameter names:
+- VB positions in degmin (offset by 180 degrees) as decimal degrees
+- WA/WM directions relative to the vessel as true directions, using the
+  VG average heading or else the VH heading
+- WA sensor level wind speeds at 10 m, using the WA sensor height and
+  speed reduction exponent
+All conversions are NumPy operations over (time, instance) arrays and
+keep NaN where an input is missing.
+"""
+import numpy as np
+import xarray as xr
+
+from .parsers.df022 import BLOCKS_METADATA
+
+DEGMIN_OFFSET = 18000.
+HEADING = 'Vessel heading'
+
+# name -> {'function', 'inputs', 'any_input', 'units', 'block'}; function
+# takes the input arrays, None for inputs absent when any_input is set
+DERIVED = {}
+
+
+def degmin_to_degrees(values):
+    """Decimal degrees of DF022 VB degmin values (dddmm.mm + 18000)"""
+    values = np.asarray(values, dtype=float)-DEGMIN_OFFSET
+    magnitude = np.abs(values)
+    degrees = np.floor(magnitude/100.)
+    return np.sign(values)*(degrees+(magnitude-100.*degrees)/60.)
+
+def relative_to_true(relative, heading):
+    """True direction in [0, 360) of a direction relative to the heading"""
+    return (np.asarray(relative, dtype=float)+heading) % 360.
+
+def wind_at_10m(speed, height, exponent):
+    """Power law speed at 10 m of a speed measured at height metres"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(speed, dtype=float)*(10./height)**exponent
+
+def _first_finite(values):
+    # (time, instance) -> (time,) first non-NaN instance, NaN if none
+    ifinite = np.isfinite(values).argmax(axis=1)
+    return values[np.arange(values.shape[0]), ifinite]
+
+def _heading(average, mean):
+    # per time, VG average where reported, VH otherwise
+    heading = None
+    for values in (average, mean):
+        if values is None:
+            continue
+        values = _first_finite(values)
+        heading = values if heading is None else np.where(np.isnan(heading), values, heading)
+    return heading
+
+def _true_direction(relative, heading):
+    # (time, instance) relative directions, (time,) heading
+    return relative_to_true(relative, heading[:, None])
+
+def _register(name, function, inputs, units, block, any_input=False):
+    DERIVED[name] = {'function': function, 'inputs': list(inputs),
+                     'any_input': any_input, 'units': units, 'block': block}
+
+def _register_defaults():
+    params = BLOCKS_METADATA['params']
+    units = BLOCKS_METADATA['units']
+    _register('Latitude decimal', degmin_to_degrees, ['Latitude'], 'deg', 'VB')
+    _register('Longitude decimal', degmin_to_degrees, ['Longitude'], 'deg', 'VB')
+    _register(HEADING, _heading,
+              ['Vessel Heading True - Average', 'Vessel Heading 1 min mean'],
+              'deg', 'VG', any_input=True)
+    for block in ('WA', 'WM'):
+        for param, unit in zip(params[block], units[block]):
+            if 'Relative' in param and unit == 'deg':
+                _register(param.replace('Relative', 'True from heading'),
+                          _true_direction, [param, HEADING], 'deg', block)
+    height, exponent = params['WA'][:2]
+    for param in params['WA']:
+        if param.endswith('Sensor level'):
+            _register(param.replace('Sensor level', '10m level from sensor level'),
+                      wind_at_10m, [param, height, exponent], 'm/s', 'WA')
+
+_register_defaults()
+
+
+class Derived(object):
+    """
+    Derived variables of a load_df022 Dataset, each computed on first
+    access and then kept:
+    - dataset: Dataset with dims (time, instance) as from load_df022
+    - names: derived variables whose inputs are in the dataset
+    - derived[name]: DataArray, KeyError for unknown or unavailable names
+    """
+    def __init__(self, dataset):
+        super(Derived, self).__init__()
+        self.dataset = dataset
+        self._values = {}
+
+    def _available(self, name):
+        if name in self.dataset.data_vars:
+            return True
+        if name not in DERIVED:
+            return False
+        found = [self._available(i) for i in DERIVED[name]['inputs']]
+        return any(found) if DERIVED[name]['any_input'] else all(found)
+
+    @property
+    def names(self):
+        return sorted(name for name in DERIVED if self._available(name))
+
+    def __contains__(self, name):
+        return name in DERIVED and self._available(name)
+
+    def _input(self, name):
+        if name in self.dataset.data_vars:
+            return self.dataset[name]
+        return self[name]
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name not in self:
+            raise KeyError(name)
+        variable = DERIVED[name]
+        inputs = [self._input(i) if self._available(i) else None
+                  for i in variable['inputs']]
+        values = variable['function'](*[None if i is None else i.values
+                                        for i in inputs])
+        # leading dims of the first input, e.g. (time,) for the heading
+        dims = next(i for i in inputs if i is not None).dims[:np.ndim(values)]
+        self._values[name] = xr.DataArray(
+            values, dims=dims, coords=dict((d, self.dataset[d]) for d in dims),
+            name=name, attrs={'units': variable['units'],
+                              'block': variable['block']})
+        return self._values[name]
+
+    def to_dataset(self, names=None):
+        """The dataset with the given (default: all available) derived variables"""
+        names = self.names if names is None else names
+        return self.dataset.assign(dict((name, self[name]) for name in names))
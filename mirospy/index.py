@@ -0,0 +1,192 @@
+"""
+Sidecar SQLite index of a Miros archive for time/site/block queries:
+    index = ArchiveIndex('/data/miros/index.sqlite')
+    index.update('/data/miros')
+    for data in index.query('1095', start, end, blocks=['VN']):
+        ...
+Only headers (and DF022 block ids, or the first and last records of
+DF037/DF038 files) are read to build the index, files are parsed when a
+query asks for them.
+"""
+import calendar
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+
+from .parsers.df022 import ParseDF022, read_block_ids
+from .parsers.df037 import ParseDF037, read_last_line
+from .parsers.df038 import ParseDF038, _record_time
+from .wrapper import (find_files, parse_records, record_site, record_time,
+                      sniff_format)
+
+# bumped when the files table changes, older indexes are rebuilt
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    site TEXT,
+    time_start INTEGER,
+    time_end INTEGER,
+    blocks TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_site_time ON files (site, time_start);
+CREATE INDEX IF NOT EXISTS files_time ON files (time_start);
+"""
+
+
+def _timestamp(time):
+    return calendar.timegm(time.timetuple())
+
+def scan_file(filename):
+    """
+    (format, site, first time, last time, block ids) of a file from its
+    header and first and last records, None if unknown
+    """
+    code = sniff_format(filename)
+    if code is None:
+        return None
+    if code in ('DF022', 'DF025'):
+        # DF025 shares the five line DF022 header
+        header = ParseDF022(filename, header_only=True).header
+        blocks = read_block_ids(filename) if code == 'DF022' else []
+        return code, header['site'], header['datetime'], header['datetime'], blocks
+    if code == 'DF038':
+        data = ParseDF038(filename)
+        times = [data.times, _record_time(read_last_line(filename))]
+        return code, record_site(data), min(times), max(times), []
+    data = ParseDF037(filename, header_only=True)
+    blocks = sorted(set(b[:2] for b in data.identifiers.get('Block_Id', [])))
+    times = data.times.astype('datetime64[s]').astype(datetime.datetime).tolist()
+    times = times or [record_time(data)]
+    return code, record_site(data), min(times), max(times), blocks
+
+
+class ArchiveIndex(object):
+    """
+    Index of file path, format, site, time range, block ids and mtime:
+    - path: SQLite database file, created if missing
+    """
+    def __init__(self, path):
+        super(ArchiveIndex, self).__init__()
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # the index only mirrors the archive, rebuild it
+            self.connection.executescript('DROP TABLE IF EXISTS files;'
+                                          'PRAGMA user_version = %d;' % SCHEMA_VERSION)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, root, prune=True):
+        """
+        Index new and modified files below root, returns how many were
+        (re)scanned; with prune rows of files no longer present are removed
+        """
+        root = os.path.abspath(root)
+        known = dict((path, (mtime, size)) for path, mtime, size in
+                     self.connection.execute('SELECT path, mtime, size FROM files'))
+        rows = []
+        seen = set()
+        for filename in find_files(root):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            seen.add(filename)
+            if known.get(filename) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                scanned = scan_file(filename)
+            except (ValueError, IndexError, KeyError):
+                # unreadable header, leave it out of the index
+                scanned = None
+            if scanned is None:
+                continue
+            code, site, start, end, blocks = scanned
+            rows.append((filename, code, site, _timestamp(start), _timestamp(end),
+                         ','+','.join(blocks)+',', stat.st_mtime_ns, stat.st_size))
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            if prune:
+                gone = [(path,) for path in known if path not in seen and
+                        (path == root or path.startswith(root+os.sep))]
+                self.connection.executemany('DELETE FROM files WHERE path = ?', gone)
+        return len(rows)
+
+    def _select(self, site, start, end, blocks, formats):
+        # (path, format) rows matching all filters, in time order; a file
+        # matches when its time range overlaps [start, end]
+        clauses = []
+        params = []
+        if site is not None:
+            clauses.append('site = ?')
+            params.append(site)
+        if start is not None:
+            clauses.append('time_end >= ?')
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append('time_start <= ?')
+            params.append(_timestamp(end))
+        for block in blocks or []:
+            clauses.append('blocks LIKE ?')
+            params.append('%%,%s,%%' % block)
+        if formats:
+            clauses.append('format IN (%s)' % ','.join('?'*len(formats)))
+            params += list(formats)
+        sql = 'SELECT path, format FROM files'
+        if clauses:
+            sql += ' WHERE '+' AND '.join(clauses)
+        sql += ' ORDER BY time_start, path'
+        return self.connection.execute(sql, params).fetchall()
+
+    def paths(self, site=None, start=None, end=None, blocks=None, formats=None):
+        """
+        Paths of indexed files matching all given filters, in time order:
+        - site: site id as in the file header
+        - start/end: inclusive datetime bounds, files with any record
+          time between them match
+        - blocks: two letter block ids that must all be present (e.g. ['VN'])
+        - formats: format codes to keep (e.g. ['DF022'])
+        """
+        return [path for path, _ in self._select(site, start, end, blocks, formats)]
+
+    def query(self, site=None, start=None, end=None, blocks=None, formats=None):
+        """
+        Parsed records of the files matching the filters (see paths) within
+        [start, end], in time order: one ParseDF038 per DATA record of
+        DF038 files, DF037 rows outside the bounds are left out
+        """
+        records = []
+        for path, code in self._select(site, start, end, blocks, formats):
+            for data in parse_records(path, [code]):
+                if isinstance(data, ParseDF037):
+                    _clip_rows(data, start, end)
+                    if data.times.size:
+                        records.append(data)
+                elif _within(record_time(data), start, end):
+                    records.append(data)
+        records.sort(key=record_time)
+        return records
+
+def _within(time, start, end):
+    return (start is None or time >= start) and (end is None or time <= end)
+
+def _clip_rows(data, start, end):
+    # keep the rows of a ParseDF037 within [start, end]
+    keep = np.ones(data.times.size, dtype=bool)
+    if start is not None:
+        keep &= data.times >= np.datetime64(start)
+    if end is not None:
+        keep &= data.times <= np.datetime64(end)
+    data.times = data.times[keep]
+    data.values = data.values[keep]
+    data.status = data.status[keep]
@@ -1,301 +1,497 @@
 # -*- coding: utf-8 -*-
 
 import datetime
-import re
+import glob
+
+import numpy as np
+import xarray as xr
+
+from .. import profiling
+
+BLOCKS_METADATA = {
+    'title' : {
+        'CL': 'Cloud Level Data',
+        'CV': 'Current from Miros Wave Radar',
+        'PT': 'Precipitation Data',
+        'PW': 'Weather and Visibility',
+        'TH': 'Air Temperature Humidity Pressure Data',
+        'VB': 'Vessel Position',
+        'VG': 'Vessel Heading True',
+        'VH': 'Vessel Heading',
+        'VM': 'Vessel Motion (general data)',
+        'VN': 'Vessel Motion (location dependant data)',
+        'WA': 'Wind Data (polar averaging)',
+        'WM': 'Wave parameters from wave spectrum',
+
+
+    },
+    'params': {
+        'CL': ['Cloud Level 1 (lowest cloud) (2min)',
+            'Cloud Level 2 (2min)',
+            'Cloud Level 3 (2min)',
+            'Vertical Visibility (ALCH) (2min)',
+            'Cloud Level 1 (lowest cloud) (10min)',
+            'Cloud Level 2 (10min)',
+            'Cloud Level 3 (10min)',
+            'Vertical Visibility (ALCH) (10min)',
+            'Laser Status',
+            'Receiver Status',
+            'Window Status',
+            'Other Status',
+            'Cloud Cover Layer 1 (30min)',
+            'Cloud Height Layer 1 (30min)',
+            'Cloud Cover Layer 2 (30min)',
+            'Cloud Height Layer 2 (30min)',
+            'Cloud Cover Layer 3 (30min)',
+            'Cloud Height Layer 3 (30min)',
+            'Cloud Cover Layer 4 (30min)',
+            'Cloud Height Layer 4 (30min)'],
+        'PT': ['Precipitation last fixed 3 hours'],
+        'PW': ['Cumulative Snow Sum Last 1 minute',
+               'Cumulative Water Sum Last 1 minute',
+               'Precipitation Water Intensity Last 1 min Average',
+               'Cumulative Snow Sum Last 1 Hour',
+               'Cumulative water sum, last 1 Hour',
+               'One Hour Present Weather Code',
+               '15 minutes Present Weather Code',
+               'Instant Present Weather Code',
+               'Visibility 1 minutes Average (MOR)',
+               'Visibility 10 minutes Average (MOR)',
+               'Instant Weather (Metar Codes - GR1)',
+               'Recent Weather (Metar Codes - GR1)',
+               'Instant Weather (Metar Codes - GR2)',
+               'Recent Weather (Metar Codes - GR2)',
+               'Instant Weather (Metar Codes - GR3)',
+               'Recent Weather (Metar Codes - GR3)',
+               'Background Luminance',
+               'Crossarm Temperature',
+               'Hardware Error',
+               'Hardware Warning',
+               'Runway Light Intensity',
+               'Visibility 1 minutes Average (RVR)',
+               'Visibility 10 minutes Average (RVR)'],
+
+        'TH': [ 'Air Temperature (1 min. mean)',
+                'Air Dewpoint Temperature (1 min. mean)',
+                'Air Humidity (1 min. mean)',
+                'Air Pressure at sensor level (1 min. mean)',
+                'Air Pressure QFE (1 min. mean)',
+                'Air Pressure QNH (1 min. mean)',
+                'Air Pressure QFF (1 min. mean)',
+                'Air Pressure 3 Hour Trend (1 min. mean)'],
+        'VB': ['Latitude','Longitude'],
+        'VG': ['Observation/ Averaging period',
+                'Vessel Heading True - Average',
+                'Vessel Heading True - Max Starboard',
+                'Vessel Heading True - Max Port',
+                'Vessel Heading True - RMS',
+                'Vessel Heading True - Start',
+                'Vessel Heading True - End'],
+        'VH': ['Vessel Heading 1 min mean'],
+        'VM': ['Observation / Averaging period',
+                'List',
+                'Max Roll Starboard',
+                'Max Roll Port',
+                'Trim',
+                'Max Pitch Up',
+                'Max Pitch Down',
+                'Average Heading',
+                'Max Yaw Starboard',
+                'Max Yaw Port',
+                'Max Roll',
+                'Max Pitch',
+                'Max Yaw',
+                'Total Roll',
+                'Total Pitch',
+                'Total Yaw',
+                'Max Static Deck Inclination'],
+        'VN':['Location x-coordinate',
+              'Location y coordinate',
+              'Location z coordinate',
+              'Observation period in minutes',
+              'Max Heave - Total (peak to peak)',
+              'Max Surge - Total (peak to peak)',
+              'Max Sway - Total (peak to peak)',
+              'Max Heave Speed',
+              'Max Surge Speed',
+              'Max Sway Speed',
+              'Max Heave Acceleration',
+              'Max Surge Acceleration',
+              'Max Sway Acceleration',
+              'Max Heave- Single (peak to peak)',
+              'Average Heave',
+              'Average Heave Speed',
+              'Average Heave Rate',
+              'Max Average Heave Rate 1',
+              'Max Average Heave Rate 2',
+              'Average Heave Period',
+              'Min Heave Period',
+              'Max Heave Period',
+              'Max Average Heave Rate 3',
+              'Significant Heave Rate'],
+        'WA': ['Sensor Height',
+                'Speed Reduction Exponent',
+                'Min. Wind Speed (Lull) True Last 2 min 10m level',
+                'Aver. Wind Speed True Last 2 min 10m level',
+                'Max. Wind Speed (Gust) True Last 2 min 10m level',
+                'Min. Wind Speed (Lull) True Last 10 min 10m level',
+                'Aver. Wind Speed True Last 10 min 10m level',
+                'Max. Wind Speed (Gust) True Last 10 min 10m level',
+                'Min. Wind Speed (Lull) True Last 2 min Sensor level',
+                'Aver. Wind Speed True Last 2 min Sensor level',
+                'Max. Wind Speed (Gust) True Last 2 min Sensor level',
+                'Min. Wind Speed (Lull) True Last 10 min Sensor level',
+                'Aver. Wind Speed True Last 10 min Sensor level',
+                'Max. Wind Speed (Gust) True Last 10 min Sensor level',
+                'Min. Wind Speed (Lull) Relative Last 2 min 10m level',
+                'Aver. Wind Speed Relative Last 2 min 10m level',
+                'Max. Wind Speed (Gust) Relative Last 2 min 10m level',
+                'Min. Wind Speed (Lull) Relative Last 10 min 10m level',
+                'Aver. Wind Speed Relative Last 10 min 10m level',
+                'Max. Wind Speed (Gust) Relative Last 10 min 10m level',
+                'Min. Wind Speed (Lull) Relative Last 2 min Sensor level',
+                'Aver. Wind Speed Relative Last 2 min Sensor level',
+                'Max. Wind Speed (Gust) Relative Last 2 min Sensor level',
+                'Min. Wind Speed (Lull) Relative Last 10 min Sensor level',
+                'Aver. Wind Speed Relative Last 10 min Sensor level',
+                'Max. Wind Speed (Gust) Relative Last 10 min Sensor level',
+                'Min. Wind Direction True Last 2 min',
+                'Aver. Wind Direction True Last 2 min',
+                'Max. Wind Direction True Last 2 min',
+                'Gust Wind Direction True Last 2 min',
+                'Min. Wind Direction True Last 10 min',
+                'Aver. Wind Direction True Last 10 min',
+                'Max. Wind Direction True Last 10 min',
+                'Gust Wind Direction True Last 10 min',
+                'Min. Wind Direction Relative Last 2 min',
+                'Aver. Wind Direction Relative Last 2 min',
+                'Max. Wind Direction Relative Last 2 min',
+                'Gust Wind Direction Relative Last 2 min',
+                'Min. Wind Direction Relative Last 10 min',
+                'Aver. Wind Direction Relative Last 10 min',
+                'Max. Wind Direction Relative Last 10 min',
+                'Gust Wind Direction Relative Last 10 min',
+                'Min. Wind Direction Magnetic Last 2 min',
+                'Aver. Wind Direction Magnetic Last 2 min',
+                'Max. Wind Direction Magnetic Last 2 min',
+                'Gust Wind Direction Magnetic Last 2 min',
+                'Min. Wind Direction Magnetic Last 10 min',
+                'Aver. Wind Direction Magnetic Last 10 min',
+                'Max. Wind Direction Magnetic Last 10 min',
+                'Gust Wind Direction Magnetic Last 10 min'],
+        'WM': ['Primary wave spectral density',
+                'Significant wave height',
+                'Maximum wave height',
+                'Wave height of maximum wave period',
+                'Primary wave peak period',
+                'Secondary wave peak period',
+                'Calculated wave peak period',
+                'Significant wave period',
+                'Energy wave period',
+                'Integral wave period',
+                'Mean zero up-crossing period',
+                'Mean period',
+                'Maximum wave period',
+                'Wave period of maximum wave height',
+                'Average wave crest period',
+                'Primary wave peak direction True',
+                'Primary wave mean direction True',
+                'Primary wave directional spread',
+                'Total energy peak direction True',
+                'Total energy mean direction True',
+                'Total energy directional spread',
+                'Spectral band width',
+                'Skewness',
+                'Wave steepness',
+                'Zero order moment',
+                '1st order moment',
+                '2nd order moment',
+                '3rd order moment',
+                '4th order moment',
+                '1st order negative moment',
+                '2nd order negative moment',
+                'Primary wave phase velocity',
+                'Primary wave length ',
+                'Primary wave group velocity',
+                'Secondary wave peak direction True',
+                'Secondary wave mean direction True',
+                'Secondary wave directional spread',
+                'Primary wave peak direction Relative',
+                'Primary wave mean direction Relative',
+                'Secondary wave peak direction Relative',
+                'Secondary wave mean direction Relative',
+                'Total energy peak direction Relative',
+                'Total energy mean direction Relative'],
+    },
+    'units': {
+        'CV': ['m','m','m','m','m','m','m',None,None,None,None,
+               'oktas','m','oktas','m','oktas','m','oktas','m'],
+        'CL': ['m/s','m/s','m/s','m/s','m/s','m/s','deg','deg',
+               'm/s','deg','deg','deg','deg','min'],
+        'PT': ['mm'],
+        'PW': ['mm','mm','mm/h','mm','mm',None,None,None,'m','m',
+               None,None,None,None,None,None,'cd/m2','degC',None,None,
+               'cd','m','m'],
+        'TH': [u'°C',u'°C','%RH','hPa','hPa','hPa','hPa','hPa'],
+        'VB': ['degmin','degmin'],
+        'VG': ['min']+['deg']*6,
+        'VH': ['deg'],
+        'VM': ['min']+['deg']*16,
+        'VN': ['m','m','m','min','m','m','m','m/s','m/s','m/s','m/s2','m/s2',
+                'm/s2','m','m','m/s','m/s','m/s','m/s','s','s','s','m/s',
+               'm/s'],
+        'WA': ['m',None]+(['m/s']*24)+(['deg']*24),
+        'WM':['m2/Hz']+(['m']*3)+(['s']*11)+(['deg']*6)+[u'ʋ']+([None]*2)+\
+             [u'm²',u'm²/s',u'm²/s²',u'm²/s³',u'm²/s⁴',u'm².s',u'm².s²',
+             'm/s','m','m/s']+['deg']*9,
+    },
+}
+
+def _build_param_index(metadata):
+    # name -> (block_id, position, unit), built once so lookups are a dict hit
+    index = {}
+    for block_id, params in metadata['params'].items():
+        units = metadata['units'].get(block_id, [])
+        for position, param in enumerate(params):
+            unit = units[position] if position < len(units) else None
+            index[param] = (block_id, position, unit)
+    return index
+
+PARAM_INDEX = _build_param_index(BLOCKS_METADATA)
+START_MARK = b'!!!!'
+END_MARK = b'$$$$$$$'
+HEADER_LINES = 5
+
+def _is_block_id(token):
+    return len(token) == 7 and token[3:4] == b'-' and token[:1].isalpha()
+
+def _is_block_end(token):
+    return _is_block_id(token) or token.startswith(END_MARK)
+
+def read_block_ids(filename):
+    """Sorted two letter ids of the blocks in a DF022 file, values not decoded"""
+    with open(filename, 'rb') as openfile:
+        tokens = openfile.read().split(b'\n', HEADER_LINES)[-1].split()
+    return sorted(set(t[:2].decode('ascii') for t in tokens if _is_block_id(t)))
+
+
+class DataBlock(object):
+    """
+    Values of one DF022 block, all instances in one array:
+    - values: (instances, params) float array, NaN for missing values and
+      for instances shorter than the widest one
+    - lengths: number of values each instance had in the file
+    It also reads like the list of lists it replaces: len(block),
+    iteration and block[i][j] give the values of instance i with None for
+    missing ones, and a block compares equal to that list of lists. The
+    lists are built on access, changing them does not change the block.
+    """
+    __slots__ = ('values', 'lengths')
+
+    def __init__(self, values, lengths):
+        self.values = values
+        self.lengths = tuple(lengths)
+
+    def _instance(self, iinst, row):
+        return [None if v != v else v for v in row[:self.lengths[iinst]]]
+
+    def tolist(self):
+        return [self._instance(iinst, row)
+                for iinst, row in enumerate(self.values.tolist())]
+
+    def column(self, index):
+        """Values of parameter index across instances, None where missing"""
+        if index >= self.values.shape[1]:
+            return [None]*len(self.lengths)
+        column = [None if v != v else v for v in self.values[:, index].tolist()]
+        if index >= min(self.lengths):
+            # past the end of the shorter instances
+            column = [v if index < n else None
+                      for v, n in zip(column, self.lengths)]
+        return column
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if index < 0:
+            index += len(self.lengths)
+        if not 0 <= index < len(self.lengths):
+            raise IndexError('block instance out of range')
+        return self._instance(index, self.values[index].tolist())
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, DataBlock):
+            return self.lengths == other.lengths and \
+                   self.values.shape == other.values.shape and \
+                   np.array_equal(self.values, other.values, equal_nan=True)
+        if isinstance(other, list):
+            return self.tolist() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'DataBlock(%r)' % self.tolist()
+
 
 class ParseDF022(object):
-    """docstring for ParseDF022"""
+    """
+    Read Miros DF022 files:
+        data = ParseDF022(filename)
+    - filename: Name of DF022 file to read
+    - header_only: read only the first five lines (format, site, datetime)
+      and leave data_blocks empty
+    - cache: optional mirospy.cache.ParseCache holding decoded blocks
+    - dtype: float type of the DataBlock arrays in data_blocks, float32
+      halves their memory
+    - text: bytes of a DF022 telegram already in memory (e.g. received
+      over a socket), filename is then only a label and may be None
+    """
     def __init__(self, filename, 
-                 missing_values=('-999.99','-999.88','-999.77')):
+                 missing_values=('-999.99','-999.88','-999.77'),
+                 header_only=False, cache=None, dtype=np.float64, text=None):
         super(ParseDF022, self).__init__()
         self.filename = filename
         self.missing_values = missing_values
-        self.raw_lines = []
+        self.dtype = np.dtype(dtype)
         self.header = {}
         self.data_blocks = {}
-        self.block_id_re = re.compile(r"^\w\w\w-\d{3}")
-        self.blocks_metadata = {
-            'title' : {
-                'CL': 'Cloud Level Data',
-                'CV': 'Current from Miros Wave Radar',
-                'PT': 'Precipitation Data',
-                'PW': 'Weather and Visibility',
-                'TH': 'Air Temperature Humidity Pressure Data',
-                'VB': 'Vessel Position',
-                'VG': 'Vessel Heading True',
-                'VH': 'Vessel Heading',
-                'VM': 'Vessel Motion (general data)',
-                'VN': 'Vessel Motion (location dependant data)',
-                'WA': 'Wind Data (polar averaging)',
-                'WM': 'Wave parameters from wave spectrum',
-
-
-            },
-            'params': {
-                'CL': ['Cloud Level 1 (lowest cloud) (2min)',
-                    'Cloud Level 2 (2min)',
-                    'Cloud Level 3 (2min)',
-                    'Vertical Visibility (ALCH) (2min)',
-                    'Cloud Level 1 (lowest cloud) (10min)',
-                    'Cloud Level 2 (10min)',
-                    'Cloud Level 3 (10min)',
-                    'Vertical Visibility (ALCH) (10min)',
-                    'Laser Status',
-                    'Receiver Status',
-                    'Window Status',
-                    'Other Status',
-                    'Cloud Cover Layer 1 (30min)',
-                    'Cloud Height Layer 1 (30min)',
-                    'Cloud Cover Layer 2 (30min)',
-                    'Cloud Height Layer 2 (30min)',
-                    'Cloud Cover Layer 3 (30min)',
-                    'Cloud Height Layer 3 (30min)',
-                    'Cloud Cover Layer 4 (30min)',
-                    'Cloud Height Layer 4 (30min)'],
-                'PT': ['Precipitation last fixed 3 hours'],
-                'PW': ['Cumulative Snow Sum Last 1 minute',
-                       'Cumulative Water Sum Last 1 minute',
-                       'Precipitation Water Intensity Last 1 min Average',
-                       'Cumulative Snow Sum Last 1 Hour',
-                       'Cumulative water sum, last 1 Hour',
-                       'One Hour Present Weather Code',
-                       '15 minutes Present Weather Code',
-                       'Instant Present Weather Code',
-                       'Visibility 1 minutes Average (MOR)',
-                       'Visibility 10 minutes Average (MOR)',
-                       'Instant Weather (Metar Codes - GR1)',
-                       'Recent Weather (Metar Codes - GR1)',
-                       'Instant Weather (Metar Codes - GR2)',
-                       'Recent Weather (Metar Codes - GR2)',
-                       'Instant Weather (Metar Codes - GR3)',
-                       'Recent Weather (Metar Codes - GR3)',
-                       'Background Luminance',
-                       'Crossarm Temperature',
-                       'Hardware Error',
-                       'Hardware Warning',
-                       'Runway Light Intensity',
-                       'Visibility 1 minutes Average (RVR)',
-                       'Visibility 10 minutes Average (RVR)'],
-
-                'TH': [ 'Air Temperature (1 min. mean)',
-                        'Air Dewpoint Temperature (1 min. mean)',
-                        'Air Humidity (1 min. mean)',
-                        'Air Pressure at sensor level (1 min. mean)',
-                        'Air Pressure QFE (1 min. mean)',
-                        'Air Pressure QNH (1 min. mean)',
-                        'Air Pressure QFF (1 min. mean)',
-                        'Air Pressure 3 Hour Trend (1 min. mean)'],
-                'VB': ['Latitude','Longitude'],
-                'VG': ['Observation/ Averaging period',
-                        'Vessel Heading True - Average',
-                        'Vessel Heading True - Max Starboard',
-                        'Vessel Heading True - Max Port',
-                        'Vessel Heading True - RMS',
-                        'Vessel Heading True - Start',
-                        'Vessel Heading True - End'],
-                'VH': ['Vessel Heading 1 min mean'],
-                'VM': ['Observation / Averaging period',
-                        'List',
-                        'Max Roll Starboard',
-                        'Max Roll Port',
-                        'Trim',
-                        'Max Pitch Up',
-                        'Max Pitch Down',
-                        'Average Heading',
-                        'Max Yaw Starboard',
-                        'Max Yaw Port',
-                        'Max Roll',
-                        'Max Pitch',
-                        'Max Yaw',
-                        'Total Roll',
-                        'Total Pitch',
-                        'Total Yaw',
-                        'Max Static Deck Inclination'],
-                'VN':['Location x-coordinate',
-                      'Location y coordinate',
-                      'Location z coordinate',
-                      'Observation period in minutes',
-                      'Max Heave - Total (peak to peak)',
-                      'Max Surge - Total (peak to peak)',
-                      'Max Sway - Total (peak to peak)',
-                      'Max Heave Speed',
-                      'Max Surge Speed',
-                      'Max Sway Speed',
-                      'Max Heave Acceleration',
-                      'Max Surge Acceleration',
-                      'Max Sway Acceleration',
-                      'Max Heave- Single (peak to peak)',
-                      'Average Heave',
-                      'Average Heave Speed',
-                      'Average Heave Rate',
-                      'Max Average Heave Rate 1',
-                      'Max Average Heave Rate 2',
-                      'Average Heave Period',
-                      'Min Heave Period',
-                      'Max Heave Period',
-                      'Max Average Heave Rate 3',
-                      'Significant Heave Rate'],
-                'WA': ['Sensor Height',
-                        'Speed Reduction Exponent',
-                        'Min. Wind Speed (Lull) True Last 2 min 10m level',
-                        'Aver. Wind Speed True Last 2 min 10m level',
-                        'Max. Wind Speed (Gust) True Last 2 min 10m level',
-                        'Min. Wind Speed (Lull) True Last 10 min 10m level',
-                        'Aver. Wind Speed True Last 10 min 10m level',
-                        'Max. Wind Speed (Gust) True Last 10 min 10m level',
-                        'Min. Wind Speed (Lull) True Last 2 min Sensor level',
-                        'Aver. Wind Speed True Last 2 min Sensor level',
-                        'Max. Wind Speed (Gust) True Last 2 min Sensor level',
-                        'Min. Wind Speed (Lull) True Last 10 min Sensor level',
-                        'Aver. Wind Speed True Last 10 min Sensor level',
-                        'Max. Wind Speed (Gust) True Last 10 min Sensor level',
-                        'Min. Wind Speed (Lull) Relative Last 2 min 10m level',
-                        'Aver. Wind Speed Relative Last 2 min 10m level',
-                        'Max. Wind Speed (Gust) Relative Last 2 min 10m level',
-                        'Min. Wind Speed (Lull) Relative Last 10 min 10m level',
-                        'Aver. Wind Speed Relative Last 10 min 10m level',
-                        'Max. Wind Speed (Gust) Relative Last 10 min 10m level',
-                        'Min. Wind Speed (Lull) Relative Last 2 min Sensor level',
-                        'Aver. Wind Speed Relative Last 2 min Sensor level',
-                        'Max. Wind Speed (Gust) Relative Last 2 min Sensor level',
-                        'Min. Wind Speed (Lull) Relative Last 10 min Sensor level',
-                        'Aver. Wind Speed Relative Last 10 min Sensor level',
-                        'Max. Wind Speed (Gust) Relative Last 10 min Sensor level',
-                        'Min. Wind Direction True Last 2 min',
-                        'Aver. Wind Direction True Last 2 min',
-                        'Max. Wind Direction True Last 2 min',
-                        'Gust Wind Direction True Last 2 min',
-                        'Min. Wind Direction True Last 10 min',
-                        'Aver. Wind Direction True Last 10 min',
-                        'Max. Wind Direction True Last 10 min',
-                        'Gust Wind Direction True Last 10 min',
-                        'Min. Wind Direction Relative Last 2 min',
-                        'Aver. Wind Direction Relative Last 2 min',
-                        'Max. Wind Direction Relative Last 2 min',
-                        'Gust Wind Direction Relative Last 2 min',
-                        'Min. Wind Direction Relative Last 10 min',
-                        'Aver. Wind Direction Relative Last 10 min',
-                        'Max. Wind Direction Relative Last 10 min',
-                        'Gust Wind Direction Relative Last 10 min',
-                        'Min. Wind Direction Magnetic Last 2 min',
-                        'Aver. Wind Direction Magnetic Last 2 min',
-                        'Max. Wind Direction Magnetic Last 2 min',
-                        'Gust Wind Direction Magnetic Last 2 min',
-                        'Min. Wind Direction Magnetic Last 10 min',
-                        'Aver. Wind Direction Magnetic Last 10 min',
-                        'Max. Wind Direction Magnetic Last 10 min',
-                        'Gust Wind Direction Magnetic Last 10 min'],
-                'WM': ['Primary wave spectral density',
-                        'Significant wave height',
-                        'Maximum wave height',
-                        'Wave height of maximum wave period',
-                        'Primary wave peak period',
-                        'Secondary wave peak period',
-                        'Calculated wave peak period',
-                        'Significant wave period',
-                        'Energy wave period',
-                        'Integral wave period',
-                        'Mean zero up-crossing period',
-                        'Mean period',
-                        'Maximum wave period',
-                        'Wave period of maximum wave height',
-                        'Average wave crest period',
-                        'Primary wave peak direction True',
-                        'Primary wave mean direction True',
-                        'Primary wave directional spread',
-                        'Total energy peak direction True',
-                        'Total energy mean direction True',
-                        'Total energy directional spread',
-                        'Spectral band width',
-                        'Skewness',
-                        'Wave steepness',
-                        'Zero order moment',
-                        '1st order moment',
-                        '2nd order moment',
-                        '3rd order moment',
-                        '4th order moment',
-                        '1st order negative moment',
-                        '2nd order negative moment',
-                        'Primary wave phase velocity',
-                        'Primary wave length ',
-                        'Primary wave group velocity',
-                        'Secondary wave peak direction True',
-                        'Secondary wave mean direction True',
-                        'Secondary wave directional spread',
-                        'Primary wave peak direction Relative',
-                        'Primary wave mean direction Relative',
-                        'Secondary wave peak direction Relative',
-                        'Secondary wave mean direction Relative',
-                        'Total energy peak direction Relative',
-                        'Total energy mean direction Relative'],
-            },
-            'units': {
-                'CV': ['m','m','m','m','m','m','m',None,None,None,None,
-                       'oktas','m','oktas','m','oktas','m','oktas','m'],
-                'CL': ['m/s','m/s','m/s','m/s','m/s','m/s','deg','deg',
-                       'm/s','deg','deg','deg','deg','min'],
-                'PT': ['mm'],
-                'PW': ['mm','mm','mm/h','mm','mm',None,None,None,'m','m',
-                       None,None,None,None,None,None,'cd/m2','degC',None,None,
-                       'cd','m','m'],
-                'TH': [u'°C',u'°C','%RH','hPa','hPa','hPa','hPa','hPa'],
-                'VB': ['degmin','degmin'],
-                'VG': ['min']+['deg']*6,
-                'VH': ['deg'],
-                'VM': ['min']+['deg']*16,
-                'VN': ['m','m','m','min','m','m','m','m/s','m/s','m/s','m/s2','m/s2',
-                        'm/s2','m','m','m/s','m/s','m/s','m/s','s','s','s','m/s',
-                       'm/s'],
-                'WA': ['m',None]+(['m/s']*24)+(['deg']*24),
-                'WM':['m2/Hz']+(['m']*3)+(['s']*11)+(['deg']*6)+[u'ʋ']+([None]*2)+\
-                     [u'm²',u'm²/s',u'm²/s²',u'm²/s³',u'm²/s⁴',u'm².s',u'm².s²',
-                     'm/s','m','m/s']+['deg']*9,
-            },
-
-        }
-
-        
-        self._read_raw()
-        self._read_header()
-        self._read_data_blocks()
-        
-    def _read_raw(self):
-        self.raw_lines = []
-        with open(self.filename) as openfile:
-            for line in openfile.readlines():
-                self.raw_lines.append(line.strip())
-
-
-    def _read_header(self):
-        self.header = {
-            'data_format': self.raw_lines[1],
-            'site': self.raw_lines[2],
-            'datetime': datetime.datetime.strptime(\
-                            self.raw_lines[3]+'T'+self.raw_lines[4],
-                            '%d-%m-%YT%H:%M')
-        }
+        self.blocks_metadata = BLOCKS_METADATA
+
+        if text is not None:
+            cache = None
+            lines = text.split(b'\n', HEADER_LINES)
+        if cache is not None and not header_only:
+            cached = cache.get(self.filename, self._cache_kind())
+            if cached is not None:
+                self._from_cache(*cached)
+                return
+        if text is None:
+            with profiling.stage('df022.read') as stage:
+                with open(self.filename, 'rb') as openfile:
+                    if header_only:
+                        lines = [openfile.readline() for _ in range(HEADER_LINES)]
+                    else:
+                        lines = openfile.read().split(b'\n', HEADER_LINES)
+                stage.bytes = sum(len(line) for line in lines)+len(lines)-1
+        self._read_header(lines[:HEADER_LINES])
+        if not header_only and len(lines) > HEADER_LINES:
+            with profiling.stage('df022.tokenize'):
+                tokens = lines[HEADER_LINES].split()
+            self._read_data_blocks(tokens)
+        if cache is not None and not header_only:
+            self._to_cache(cache)
+
+    def _read_header(self, lines):
+        with profiling.stage('df022.header'):
+            lines = [line.decode('latin-1').strip() for line in lines]
+            self.header = {
+                'data_format': lines[1],
+                'site': lines[2],
+                'datetime': datetime.datetime.strptime(\
+                                lines[3]+'T'+lines[4],
+                                '%d-%m-%YT%H:%M')
+            }
     
-    def _read_data_blocks(self):
+    def _read_data_blocks(self, tokens):
+        # block ids (e.g. CL1-022) carry the number of values that follow,
+        # so the tokens are walked block to block; block_id -> {instance:
+        # [(start, end), ...]} token ranges
+        with profiling.stage('df022.blocks'):
+            slices = {}
+            ntokens = len(tokens)
+            itoken = 0
+            while itoken < ntokens:
+                token = tokens[itoken]
+                if token.startswith(END_MARK):
+                    break
+                if not _is_block_id(token):
+                    itoken += 1
+                    continue
+                end = itoken+int(token[4:])
+                if end <= itoken or end > ntokens or \
+                        (end < ntokens and not _is_block_end(tokens[end])):
+                    # count disagrees with the content (or is not even the
+                    # block id itself), scan for the next block
+                    end = itoken+1
+                    while end < ntokens and not _is_block_end(tokens[end]):
+                        end += 1
+                block_n = int(token[2:3])-1 if token[2:3].isdigit() else 0
+                slices.setdefault(token[:2], {}).setdefault(block_n, []).append(
+                    (itoken+1, end))
+                itoken = end
+
+            # tokens are laid out block after block as (instances, width) rows
+            # padded with nan, so one conversion gives every block array
+            params = self.blocks_metadata['params']
+            layout = []
+            padded = []
+            nvalues = 0
+            for block_id, instances in slices.items():
+                block_id = block_id.decode('ascii')
+                lengths = [0]*(max(instances)+1)
+                for block_n, ranges in instances.items():
+                    lengths[block_n] = sum(end-start for start, end in ranges)
+                width = max(lengths+[len(params.get(block_id, []))])
+                layout.append((block_id, len(padded), width, lengths))
+                nvalues += sum(lengths)
+                for block_n, length in enumerate(lengths):
+                    for start, end in instances.get(block_n, ()):
+                        padded += tokens[start:end]
+                    padded += [b'nan']*(width-length)
+
+        with profiling.stage('df022.convert') as stage:
+            values = np.array(padded, dtype=float)
+            missing = np.zeros(values.shape, dtype=bool)
+            for missing_value in self.missing_values:
+                missing |= values == float(missing_value)
+            values[missing] = np.nan
+            if values.dtype != self.dtype:
+                values = values.astype(self.dtype)
+            stage.values = nvalues
+
         blocks = {}
-        for line in self.raw_lines[5:]:
-            if self.block_id_re.match(line):
-                block_id = line[:2]
-
-                try: block_n = int(line[2])-1
-                except: block_n = 0
-
-                if block_id not in blocks:
-                    blocks[block_id] = [[]]
-                elif (block_n+1) > len(blocks[block_id]):
-                    blocks[block_id] += [[]]*((block_n+1)-len(blocks[block_id]))
-            elif line == '$$$$$$$':
-                pass
-            else:
-                value = float(line) if line not in self.missing_values else None
-                blocks[block_id][block_n].append(value)
+        for block_id, offset, width, lengths in layout:
+            blocks[block_id] = DataBlock(
+                values[offset:offset+len(lengths)*width].reshape(-1, width),
+                lengths)
 
         self.data_blocks = blocks
 
+    def _cache_kind(self):
+        return 'df022:%s:%s' % (','.join(self.missing_values), self.dtype.str)
+
+    def _to_cache(self, cache):
+        # block arrays are at least as wide as their parameter list so a
+        # warm load serves them straight from the memory map
+        header = dict(self.header, datetime=self.header['datetime'].isoformat())
+        lengths = {}
+        arrays = {}
+        for block_id, block in self.data_blocks.items():
+            lengths[block_id] = list(block.lengths)
+            arrays[block_id] = block.values
+        cache.put(self.filename, self._cache_kind(),
+                  {'header': header, 'lengths': lengths},
+                  arrays)
+
+    def _from_cache(self, meta, arrays):
+        self.header = dict(meta['header'])
+        self.header['datetime'] = datetime.datetime.fromisoformat(
+                                    self.header['datetime'])
+        for block_id, array in arrays.items():
+            self.data_blocks[block_id] = DataBlock(array,
+                                                   meta['lengths'][block_id])
+
     @property
     def available_blocks(self):
         params = {}
@@ -304,17 +500,195 @@ class ParseDF022(object):
         return params
     
     def get_param(self, param, units=False):
-        for key, values in self.data_blocks.items():
-            if key in self.blocks_metadata['params'] and\
-               param in self.blocks_metadata['params'][key]:
-                try:
-                    param_index = self.blocks_metadata['params'][key].index(param)
-                    param_values = [v[param_index] for v in values]
-                    if units:
-                        unit = self.blocks_metadata['units'][key][param_index]
-                        return param_values,unit
-                    else:
-                        return param_values
-                except:
-                    pass
+        if param not in PARAM_INDEX:
+            return None
+        block_id, param_index, unit = PARAM_INDEX[param]
+        if block_id not in self.data_blocks:
+            return None
+        param_values = self.data_blocks[block_id].column(param_index)
+        if units:
+            return param_values,unit
+        return param_values
+
+    def _block_array(self, block_id):
+        # (instances, params) view of a block, NaN for missing values
+        nparams = len(self.blocks_metadata['params'][block_id])
+        return self.data_blocks[block_id].values[:, :nparams]
+
+    def get_params(self, params, units=False):
+        """
+        Bulk version of get_param:
+            values = data.get_params(['Significant wave height', ...])
+        - returns {param: array} with one value per block instance, NaN for
+          missing values and an empty array if the block is not in the file
+        - with units=True returns ({param: array}, {param: unit})
+        - raises KeyError for names not in blocks_metadata['params']
+        """
+        by_block = {}
+        for param in params:
+            block_id, param_index, _ = PARAM_INDEX[param]
+            by_block.setdefault(block_id, []).append((param, param_index))
+        param_values = {}
+        for block_id, entries in by_block.items():
+            if block_id in self.data_blocks:
+                # one fancy-index take per block
+                columns = self._block_array(block_id).T[[i for _, i in entries]]
+            else:
+                columns = np.empty((len(entries), 0))
+            for (param, _), column in zip(entries, columns):
+                param_values[param] = column
+        if units:
+            return param_values, dict((p, PARAM_INDEX[p][2]) for p in params)
+        return param_values
+
+
+
+class StreamDF022(object):
+    """
+    Incremental DF022 parser for telegrams arriving in pieces, e.g. over TCP:
+        stream = StreamDF022(filename='10.0.0.5:4001')
+        for data in stream.feed(chunk):
+            ...
+    - feed returns the ParseDF022 objects of the telegrams completed by
+      that chunk, as soon as their $$$$$$$ terminator has arrived
+    - bytes before a !!!! header are skipped; a telegram cut short by a
+      new header, or growing past max_size bytes, is dropped and counted
+      in dropped, one that does not parse is counted in errors
+    - missing_values, dtype: as for ParseDF022
+    - filename: label given to the parsed telegrams
+    """
+    def __init__(self, missing_values=('-999.99','-999.88','-999.77'),
+                 dtype=np.float64, filename=None, max_size=2**20):
+        super(StreamDF022, self).__init__()
+        self.missing_values = missing_values
+        self.dtype = dtype
+        self.filename = filename
+        self.max_size = max_size
+        self.dropped = 0
+        self.errors = 0
+        # holds the current telegram from its header on once synced
+        self._buffer = bytearray()
+        self._synced = False
+        # bytes of the buffer already searched for marks
+        self._scanned = 0
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        buffer = self._buffer
+        telegrams = []
+        while True:
+            if not self._synced:
+                start = buffer.find(START_MARK)
+                if start < 0:
+                    # a header may be split across chunks
+                    del buffer[:-len(START_MARK)+1]
+                    break
+                del buffer[:start]
+                self._synced = True
+                self._scanned = len(START_MARK)
+            # marks may straddle the previous chunk boundary
+            end = buffer.find(END_MARK, max(self._scanned-len(END_MARK)+1,
+                                            len(START_MARK)))
+            restart = buffer.find(START_MARK,
+                                  max(self._scanned-len(START_MARK)+1,
+                                      len(START_MARK)),
+                                  end if end >= 0 else len(buffer))
+            if restart >= 0:
+                del buffer[:restart]
+                self._scanned = len(START_MARK)
+                self.dropped += 1
+                continue
+            if end < 0:
+                self._scanned = len(buffer)
+                if len(buffer) > self.max_size:
+                    del buffer[:]
+                    self._synced = False
+                    self.dropped += 1
+                break
+            end += len(END_MARK)
+            telegram = bytes(buffer[:end])
+            del buffer[:end]
+            self._synced = False
+            try:
+                telegrams.append(ParseDF022(self.filename, self.missing_values,
+                                            dtype=self.dtype, text=telegram))
+            except (ValueError, IndexError):
+                self.errors += 1
+        return telegrams
+
+
+
+def _stacked_dataset(times, buffers):
+    # buffers: block_id -> (params, time, instance) array
+    metadata = BLOCKS_METADATA
+    ninst = max([buf.shape[2] for buf in buffers.values()] or [0])
+    data_vars = {}
+    for block_id, buf in buffers.items():
+        units = metadata['units'].get(block_id, [])
+        for iparam, param in enumerate(metadata['params'][block_id]):
+            attrs = {'block': block_id}
+            if iparam < len(units) and units[iparam] is not None:
+                attrs['units'] = units[iparam]
+            data_vars[param] = (('time', 'instance'), buf[iparam], attrs)
+    with profiling.stage('df022.xarray'):
+        return xr.Dataset(data_vars,
+                          coords={'time': times,
+                                  'instance': np.arange(1, ninst+1)})
+
+def load_df022(files, missing_values=('-999.99','-999.88','-999.77'),
+               cache=None):
+    """
+    Stack many DF022 files into one time-indexed xarray Dataset:
+        ds = load_df022('archive/*/MIR_All_NOW.DF022')
+    - files: list of filenames or a glob pattern
+    - cache: optional mirospy.cache.ParseCache keeping the stacked arrays of
+      this list of files, a warm load memory-maps them; when the list
+      changed, the blocks cached for each file are used instead
+    - returns a Dataset with dims (time, instance) and one variable per
+      parameter in blocks_metadata['params'], NaN where values are missing
+    """
+    if isinstance(files, str):
+        files = sorted(glob.glob(files))
+    cache_kind = 'df022-stack:'+','.join(missing_values)
+    if cache is not None:
+        cached = cache.get(files, cache_kind)
+        if cached is not None:
+            arrays = cached[1]
+            times = arrays.pop('time')
+            return _stacked_dataset(times, arrays)
 
+    ntime = len(files)
+    # header pass for the time order, so each file is written straight into
+    # its sorted row
+    times = np.array([ParseDF022(filename, header_only=True).header['datetime']
+                      for filename in files], dtype='datetime64[s]')
+    order = np.argsort(times, kind='stable')
+    rows = np.empty(ntime, dtype=int)
+    rows[order] = np.arange(ntime)
+    times = times[order]
+    buffers = {}
+    params = BLOCKS_METADATA['params']
+    ninst = 0
+    for filename, row in zip(files, rows):
+        data = ParseDF022(filename, missing_values, cache=cache)
+        blocks = [(block_id, block) for block_id, block in data.data_blocks.items()
+                  if block_id in params]
+        widest = max([len(block) for _, block in blocks] or [0])
+        if widest > ninst:
+            # every buffer has the instance width of the widest block so far,
+            # usually reached with the first file
+            ninst = widest
+            for block_id, buf in buffers.items():
+                grown = np.full(buf.shape[:2]+(ninst,), np.nan)
+                grown[:, :, :buf.shape[2]] = buf
+                buffers[block_id] = grown
+        for block_id, block in blocks:
+            nparams = len(params[block_id])
+            buf = buffers.get(block_id)
+            if buf is None:
+                # (params, time, instance) so each variable is a contiguous view
+                buf = buffers[block_id] = np.full((nparams, ntime, ninst), np.nan)
+            buf[:, row, :len(block)] = block.values[:, :nparams].T
+    if cache is not None:
+        cache.put(files, cache_kind, {}, dict(buffers, time=times))
+    return _stacked_dataset(times, buffers)
@@ -0,0 +1,69 @@
+import datetime
+
+import numpy as np
+
+NCOLUMNS = 8
+END_MARK = '$$$$'
+
+
+class ParseDF025(object):
+    """
+    Read directional wave data from Miros format DF025:
+        data = ParseDF025(filename)
+    - filename: Name of DF025 file to read
+    - header: data_format, site and datetime as in ParseDF022, latitude and
+      longitude in decimal degrees and the raw lines between the header and
+      the data matrix under 'info'
+    - data: (rows, 8) array of the E-notation value matrix
+    """
+    def __init__(self, filename):
+        super(ParseDF025, self).__init__()
+        self.filename = filename
+        self.header = {}
+        self.data = np.empty((0, NCOLUMNS))
+
+        with open(self.filename, 'r') as openfile:
+            content = openfile.read()
+        self._read(content)
+
+    def _read(self, content):
+        lines = content.split('\n')
+        self.header = {
+            'data_format': lines[1].strip(),
+            'site': lines[2].strip(),
+            'datetime': datetime.datetime.strptime(
+                            lines[3].strip()+'T'+lines[4].strip(),
+                            '%d-%m-%YT%H:%M')
+        }
+        # the matrix starts at the first line holding a full row of values
+        offset = sum(len(line)+1 for line in lines[:5])
+        info = []
+        for line in lines[5:]:
+            if len(line.split()) == NCOLUMNS:
+                break
+            info.append(line.strip())
+            offset += len(line)+1
+        self.header['info'] = info
+        self._read_position(info)
+
+        end = content.find(END_MARK, offset)
+        end = len(content) if end < 0 else end
+        values = np.fromstring(content[offset:end], sep=' ')
+        if values.size % NCOLUMNS:
+            raise ValueError('Data matrix of %s is not %d columns wide'
+                             % (self.filename, NCOLUMNS))
+        self.data = values.reshape(-1, NCOLUMNS)
+
+    def _read_position(self, info):
+        # degmin value followed by its hemisphere, e.g. "6146.88 N 250.00 E"
+        for line in info:
+            tokens = line.split()
+            for value, hemisphere in zip(tokens[:-1], tokens[1:]):
+                if hemisphere not in ('N', 'S', 'E', 'W'):
+                    continue
+                degmin = float(value)
+                degrees = int(degmin/100)+(degmin % 100)/60.
+                if hemisphere in ('S', 'W'):
+                    degrees = -degrees
+                key = 'latitude' if hemisphere in ('N', 'S') else 'longitude'
+                self.header[key] = degrees
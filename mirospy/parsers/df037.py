@@ -0,0 +1,139 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+TAIL_BYTES = 16384
+
+def read_last_line(filename):
+    """Last non-empty line of a file, read backwards from its end"""
+    with open(filename, 'rb') as openfile:
+        end = openfile.seek(0, os.SEEK_END)
+        size = TAIL_BYTES
+        while True:
+            openfile.seek(max(0, end-size))
+            tail = openfile.read().rstrip()
+            if b'\n' in tail or size >= end:
+                return tail.rpartition(b'\n')[2].decode('latin-1').strip()
+            size *= 2
+
+
+class ParseDF037(object):
+    """
+    Read wave parameters from Miros format DF037:
+        data = ParseDF037(filename)
+    - filename: Name of DF037 file to read
+    - header_only: read the sections up to the first DATA line and the
+      last line of the file, times/values then hold those two rows only
+    - values: (time, parameter) array, NaN for missing values
+    - codes/units: Parameter_Code and Parameter_Unit of each column
+    """
+    def __init__(self, filename,
+                 missing_values=('-999.99','-999.88','-999.77'),
+                 header_only=False):
+        super(ParseDF037, self).__init__()
+        self.filename = filename
+        self.missing_values = missing_values
+        self.header = {}
+        self.identifiers = {}
+        self.codes = []
+        self.units = []
+        self.times = np.empty(0, dtype='datetime64[ms]')
+        self.values = np.empty((0, 0))
+        self.status = np.empty(0, dtype=str)
+
+        with open(self.filename, 'r') as openfile:
+            if header_only:
+                lines = self._read_head(openfile)
+            else:
+                lines = openfile.read().splitlines()
+        if header_only and lines and lines[-1].strip() != '[DATA]':
+            last = read_last_line(self.filename)
+            if last != lines[-1].strip():
+                lines.append(last)
+        sections = self._read_sections(lines)
+        self._read_identifiers(sections.get('PARAMETER_IDENTIFIER', []))
+        self._read_data(sections.get('DATA', []))
+
+    def _read_head(self, openfile):
+        # lines up to and including the first DATA line
+        lines = []
+        in_data = False
+        for line in openfile:
+            lines.append(line)
+            if in_data and line.strip():
+                break
+            in_data = in_data or line.strip() == '[DATA]'
+        return lines
+
+    def _read_sections(self, lines):
+        # split into [SECTION] -> lines, key=value lines outside the
+        # identifier table and data go to header
+        sections = {}
+        current = None
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('[') and stripped.endswith(']'):
+                current = sections.setdefault(stripped[1:-1], [])
+            elif current is not None and stripped:
+                current.append(line.rstrip())
+        for name, section in sections.items():
+            if name in ('PARAMETER_IDENTIFIER', 'DATA'):
+                continue
+            for line in section:
+                key, sep, value = line.partition('=')
+                if sep:
+                    self.header[key.strip()] = value.strip()
+        return sections
+
+    def _read_identifiers(self, lines):
+        # right-aligned fixed-width columns, some values contain spaces
+        # (Sensor_Id), so the boundaries are taken from the Parameter_Code row
+        rows = dict((line.partition('=')[0], line) for line in lines)
+        if 'Parameter_Code' not in rows:
+            raise ValueError('No Parameter_Code row in %s' % self.filename)
+        code_row = rows['Parameter_Code']
+        start = code_row.index('=')+1
+        ends = [m.end() for m in re.finditer(r'\S+', code_row[start:])]
+        bounds = list(zip([start]+[start+e for e in ends[:-1]],
+                          [start+e for e in ends]))
+        for key, line in rows.items():
+            self.identifiers[key] = [line[a:b].strip() for a, b in bounds]
+        self.codes = self.identifiers['Parameter_Code']
+        self.units = self.identifiers.get('Parameter_Unit', [None]*len(self.codes))
+
+    def _read_data(self, lines):
+        # each line is: date time Z value_1 .. value_n status
+        ncols = len(self.codes)+4
+        tokens = np.array(' '.join(lines).split())
+        if tokens.size % ncols:
+            raise ValueError('DATA lines of %s do not have %d columns'
+                             % (self.filename, ncols))
+        tokens = tokens.reshape(-1, ncols)
+        self.times = (np.char.add(np.char.add(tokens[:, 0], 'T'), tokens[:, 1])
+                      .astype('datetime64[ms]'))
+        values = tokens[:, 3:-1].astype(float)
+        for missing_value in self.missing_values:
+            values[values == float(missing_value)] = np.nan
+        self.values = values
+        self.status = tokens[:, -1]
+
+    def get_param(self, code, units=False):
+        index = self.codes.index(code)
+        if units:
+            return self.values[:, index], self.units[index]
+        return self.values[:, index]
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.values, columns=self.codes,
+                            index=pd.Index(self.times, name='time'))
+
+    def to_dataset(self):
+        data_vars = {}
+        for index, (code, unit) in enumerate(zip(self.codes, self.units)):
+            data_vars[code] = (('time',), self.values[:, index],
+                               {'units': unit} if unit else {})
+        return xr.Dataset(data_vars, coords={'time': self.times},
+                          attrs=self.header)
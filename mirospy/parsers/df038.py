@@ -1,77 +1,308 @@
+import glob
+import os
 import re
+import time
 import datetime as dt
 
 import numpy as np
 import xarray as xr
+
+from .. import profiling
+
+# the import is slow and paid by every process, always recorded
+_start = time.perf_counter()
 from wavespectra.specarray import SpecArray
 from wavespectra.specdataset import SpecDataset
+profiling.record('df038.import_wavespectra', time.perf_counter()-_start)
+del _start
 
 
 __version__ = '1.0'
 __author__ = 'MetOcean Solutions Ltd.'
 
+CACHE_KIND = 'df038'
+
 class ParseDF038(object):
     """
     Read spectra from Shell format DF038:
         classInstance = SpectraShell(filename)
     - filename: Name of spectra file to read
+    - only the first DATA record is read, use load_df038 for files or
+      archives with many records
+    - header fields, time and position are read on construction, the
+      spectrum is decoded on first access to spec2d
+    - cache: optional mirospy.cache.ParseCache holding decoded spectra
     - TODO improve description
-    - TODO generalize for multiple times (array)
     """
-    def __init__(self, filename):
-        
-        self.filename = filename        
-        self._file2dict() # generate dictionary 'dictshell'
+    def __init__(self, filename, cache=None, _decoded=None):
+
+        self.filename = filename
+        self.cache = cache
+        self._spec2d = None
+        # (meta, arrays) of an already decoded record, as from the cache
+        self._cached = _decoded
+        if cache is not None and _decoded is None:
+            self._cached = cache.get(filename, CACHE_KIND)
+        if self._cached is not None:
+            self.dictshell = dict(self._cached[0]['header'])
+        else:
+            self._file2dict() # generate dictionary 'dictshell'
         self.nfreq = int(self.dictshell['Number_Of_Frequencies'])
         self.ifreq = float(self.dictshell['Start_Frequency'])
         self.dfreq = float(self.dictshell['Frequency_Resolution'])
-        self.freqs = np.arange(self.ifreq,self.nfreq*self.dfreq,self.dfreq)
         self.ndirs = int(self.dictshell['Number_Of_Directions'])
-        self.dirs = np.arange(0,360,360./ self.ndirs)
+        self.freqs, self.dirs = _spectral_grid(self.dictshell)
         # set of methods to extract dimensions and spectra
         self._get_times()
         self._get_lonlat()
-        self._get_spectra()
+
+    @property
+    def spec2d(self):
+        if self._spec2d is None:
+            self._get_spectra()
+        return self._spec2d
 
     def _file2dict(self):
-        fid = open(self.filename, 'r')
-        FileContent = fid.read().splitlines() # list with file FileContent
-        indicesH = [i for i, s in enumerate(FileContent) if '=' in s] # indices of header values, defined with '='
-        # dictionary with all header info and data
-        self.dictshell = dict([(FileContent[i].split("=")[0],FileContent[i].split("=")[1]) for i in indicesH])        
-        indiceD = FileContent.index('[DATA]')+1 # Indice of 'Data' in FileContent list
-        self.dictshell.update(dict([('DATA', FileContent[indiceD])]))
+        # header values up to [DATA] plus the first record, nothing else is read
+        with profiling.stage('df038.read_header'), \
+             open(self.filename, 'r') as openfile:
+            self.dictshell = _read_header(openfile)
+            for line in openfile:
+                if line.strip():
+                    self.dictshell['DATA'] = line.strip()
+                    break
+            else:
+                raise ValueError('No DATA record in %s' % self.filename)
 
     def _get_times(self):
-        content = self.dictshell['DATA']
-        # get time valuer from file
-        year,month,day,hour,minu,sec = re.split(' |-|:', content[:content.find("Z")])[:-1]
-        self.times = dt.datetime(int(year), int(month), int(day), int(hour), int(minu), int(sec))
+        if self._cached is not None:
+            self.times = self._cached[1]['times'][0].astype(dt.datetime)
+        else:
+            with profiling.stage('df038.datetime'):
+                self.times = _record_time(self.dictshell['DATA'])
 
     def _get_lonlat(self):
-        content = self.dictshell['DATA']
-        coordstr = re.split(' |,| ', content[-20:])
-        self.lon = float(coordstr[2][0:3])+(float(coordstr[2][3:])/60)
-        self.lon = -self.lon if coordstr[3] is 'W' else self.lon
-        self.lat = float(coordstr[0][0:2])+(float(coordstr[0][2:])/60)
-        self.lat = -self.lat if coordstr[3] is 'S' else self.lat
-    
+        if self._cached is not None:
+            self.lon = float(self._cached[1]['lons'][0])
+            self.lat = float(self._cached[1]['lats'][0])
+        else:
+            with profiling.stage('df038.position'):
+                self.lon, self.lat = _record_lonlat(self.dictshell['DATA'])
+
     def _get_spectra(self):
-        content = self.dictshell['DATA']
-        specs = np.fromstring(content[content.find("Z")+1:content.find("1-------")],sep=' ') # remove time
-        dirscopy = self.dirs + 180 # correct direction to "coming from" 
-        dirscopy[dirscopy>=360] = dirscopy[dirscopy>=360]-360
-        idirs = dirscopy.argsort() 
-        spec = specs[self.nfreq:].reshape(1, 1, 1, self.ndirs, self.nfreq).transpose(0,1, 2, 4, 3)
+        if self._cached is not None:
+            spec = self._cached[1]['spec'][0]
+        elif self.cache is not None:
+            spec = _file_arrays(self.filename, self.cache)[1]['spec'][0]
+        else:
+            idirs = _direction_order(self.dirs)
+            spec = _record_spectrum(self.dictshell['DATA'], self.nfreq, self.ndirs)
+            spec = spec[:, idirs]
+        spec = spec.reshape(1, 1, 1, self.nfreq, self.ndirs)
         # convert spectra to DataArray:
-        self.spec2d = xr.DataArray(spec[:,:,:,:,idirs], coords={'time': [self.times], 'lat': [self.lat], 'lon': [self.lon], \
-                                                 'freq': self.freqs, 'dir': self.dirs}, \
-                                                  dims=('time', 'lat', 'lon', 'freq', 'dir'))
+        with profiling.stage('df038.xarray'):
+            self._spec2d = xr.DataArray(spec, coords={'time': [self.times], 'lat': [self.lat], 'lon': [self.lon], \
+                                                     'freq': self.freqs, 'dir': self.dirs}, \
+                                                      dims=('time', 'lat', 'lon', 'freq', 'dir'))
 
-    def shell2swan(self):
+    def shell2swan(self, filename=None):
+        """Write the spectrum to SWAN file filename, default <name>.spec in pwd"""
+        if filename is None:
+            filename = self.filename.split('/')[-1]+'.spec'
         ds = self.spec2d.to_dataset(name='efth')
-        ds.spec.to_swan(self.filename.split('/')[-1]+'.spec') # write SWAN spec file in pwd
+        with profiling.stage('df038.swan'):
+            ds.spec.to_swan(filename)
+
+
+def _spectral_grid(dictshell):
+    nfreq = int(dictshell['Number_Of_Frequencies'])
+    ifreq = float(dictshell['Start_Frequency'])
+    dfreq = float(dictshell['Frequency_Resolution'])
+    ndirs = int(dictshell['Number_Of_Directions'])
+    freqs = ifreq + dfreq*np.arange(nfreq)
+    dirs = np.arange(0, 360, 360./ndirs)
+    return freqs, dirs
+
+def _direction_order(dirs):
+    # indices reordering the stored directions to "coming from" convention
+    dirscopy = dirs + 180
+    dirscopy[dirscopy>=360] = dirscopy[dirscopy>=360]-360
+    return dirscopy.argsort()
+
+def _record_time(record):
+    year,month,day,hour,minu,sec = re.split(' |-|:', record[:record.find("Z")])[:-1]
+    return dt.datetime(int(year), int(month), int(day), int(hour), int(minu), int(sec))
+
+def _record_lonlat(record):
+    coordstr = re.split(' |,', record.rstrip()[-20:])
+    lon = float(coordstr[2][0:3])+(float(coordstr[2][3:])/60)
+    lon = -lon if coordstr[3] == 'W' else lon
+    lat = float(coordstr[0][0:2])+(float(coordstr[0][2:])/60)
+    lat = -lat if coordstr[1] == 'S' else lat
+    return lon, lat
+
+def _record_spectrum(record, nfreq, ndirs):
+    # (freq, dir) spectrum in file direction order; the record holds a 1D
+    # spectrum of nfreq values followed by ndirs blocks of nfreq values
+    with profiling.stage('df038.spectrum') as stage:
+        specs = np.fromstring(record[record.find("Z")+1:], sep=' ',
+                              count=nfreq*(ndirs+1))
+        stage.values = specs.size
+    return specs[nfreq:].reshape(ndirs, nfreq).T
+
+def _read_header(openfile):
+    # key=value header lines, leaves openfile positioned after [DATA]
+    header = {}
+    for line in openfile:
+        line = line.strip()
+        if line == '[DATA]':
+            return header
+        key, sep, value = line.partition('=')
+        if sep:
+            header[key] = value
+    raise ValueError('No [DATA] section in %s' % openfile.name)
+
+def _read_records(filename):
+    # header dictionary and the list of DATA lines of one file
+    records = []
+    with profiling.stage('df038.read') as stage, open(filename, 'r') as openfile:
+        header = _read_header(openfile)
+        for line in openfile:
+            line = line.strip()
+            if line:
+                records.append(line)
+        stage.bytes = os.fstat(openfile.fileno()).st_size
+    return header, records
+
+def _decode_records(records, nfreq, ndirs, idirs, arrays, start=0):
+    # decode DATA records into rows start... of the spec/times/lons/lats arrays
+    for irec, record in enumerate(records, start):
+        arrays['spec'][irec] = _record_spectrum(record, nfreq, ndirs)[:, idirs]
+        with profiling.stage('df038.datetime'):
+            arrays['times'][irec] = _record_time(record)
+        with profiling.stage('df038.position'):
+            arrays['lons'][irec], arrays['lats'][irec] = _record_lonlat(record)
+
+def _decode_file(filename, idirs=None):
+    # header and (time, lon, lat, spectrum) arrays of every record of a file
+    header, records = _read_records(filename)
+    freqs, dirs = _spectral_grid(header)
+    if idirs is None:
+        idirs = _direction_order(dirs)
+    arrays = {
+        'times': np.empty(len(records), dtype='datetime64[s]'),
+        'lons': np.empty(len(records)),
+        'lats': np.empty(len(records)),
+        'spec': np.empty((len(records), freqs.size, dirs.size)),
+    }
+    _decode_records(records, freqs.size, dirs.size, idirs, arrays)
+    return header, arrays
+
+def _file_arrays(filename, cache=None, idirs=None):
+    if cache is not None:
+        cached = cache.get(filename, CACHE_KIND)
+        if cached is not None:
+            return cached[0]['header'], cached[1]
+    header, arrays = _decode_file(filename, idirs)
+    if cache is not None:
+        cache.put(filename, CACHE_KIND, {'header': header}, arrays)
+    return header, arrays
+
+def read_records(filename, cache=None):
+    """
+    Every DATA record of a DF038 file as a ParseDF038 with its spectrum
+    already decoded, in file order
+    """
+    header, arrays = _file_arrays(filename, cache)
+    records = []
+    for irec in range(arrays['times'].size):
+        record = dict((key, value[irec:irec+1]) for key, value in arrays.items())
+        data = ParseDF038(filename, _decoded=({'header': header}, record))
+        data.spec2d
+        records.append(data)
+    return records
+
+def _find_files(files):
+    # list of filenames from a list, a glob pattern or a directory
+    if isinstance(files, str):
+        if os.path.isdir(files):
+            files = glob.glob(os.path.join(files, '**', '*.DF038'), recursive=True)
+        else:
+            files = glob.glob(files)
+        files = sorted(files)
+    return files
+
+def load_df038(files, cache=None):
+    """
+    Read every DATA record of many DF038 files into one spectra DataArray:
+        efth = load_df038('archive/LD1/')
+    - files: list of filenames, a glob pattern or a directory searched
+      recursively for *.DF038 files
+    - cache: optional mirospy.cache.ParseCache keeping the decoded arrays
+      of this list of files, a warm load memory-maps them; when the list
+      changed, the arrays cached for each file are used instead
+    - returns a float32 DataArray with dims (time, freq, dir) and lon/lat
+      coordinates along time, sorted by time
+    """
+    files = _find_files(files)
+    if cache is not None:
+        cached = cache.get(files, CACHE_KIND+'-stack')
+        if cached is not None:
+            return _spectra_array(**cached[1])
+
+    freqs = dirs = idirs = None
+    # grown by doubling when files hold more than one record each
+    size = max(len(files), 1)
+    stack = {'spec': None,
+             'times': np.empty(size, dtype='datetime64[s]'),
+             'lons': np.empty(size),
+             'lats': np.empty(size)}
+    nrec = 0
+    for filename in files:
+        if cache is None:
+            header, records = _read_records(filename)
+            nfile = len(records)
+        else:
+            header, arrays = _file_arrays(filename, cache, idirs)
+            nfile = arrays['times'].size
+        grid = _spectral_grid(header)
+        if freqs is None:
+            freqs, dirs = grid
+            idirs = _direction_order(dirs)
+            stack['spec'] = np.empty((size, freqs.size, dirs.size), dtype=np.float32)
+        elif not (np.array_equal(grid[0], freqs) and np.array_equal(grid[1], dirs)):
+            raise ValueError('Spectral grid of %s differs from %s'
+                             % (filename, files[0]))
+        if nrec+nfile > size:
+            size = max(2*size, nrec+nfile)
+            for name, values in stack.items():
+                stack[name] = np.resize(values, (size,)+values.shape[1:])
+        if cache is None:
+            # straight into the float32 stack, no per-file arrays
+            _decode_records(records, freqs.size, dirs.size, idirs, stack, nrec)
+        else:
+            for name, values in stack.items():
+                values[nrec:nrec+nfile] = arrays[name]
+        nrec += nfile
+
+    if freqs is None:
+        raise ValueError('No DF038 files to load')
+    order = np.argsort(stack['times'][:nrec], kind='stable')
+    if np.all(order == np.arange(nrec)):
+        order = slice(None)
+    arrays = dict((name, values[:nrec][order]) for name, values in stack.items())
+    arrays.update(freqs=freqs, dirs=dirs)
+    if cache is not None:
+        cache.put(files, CACHE_KIND+'-stack', {}, arrays)
+    return _spectra_array(**arrays)
+
+def _spectra_array(spec, times, lons, lats, freqs, dirs):
+    with profiling.stage('df038.xarray'):
+        return xr.DataArray(spec,
+                            coords={'time': times, 'freq': freqs, 'dir': dirs,
+                                    'lon': ('time', lons), 'lat': ('time', lats)},
+                            dims=('time', 'freq', 'dir'), name='efth')
 
 if __name__ == '__main__':
     filename = './Example_files/MIR_LD1_NOW.DF038'
-    shell = ShellDF038(filename)
\ No newline at end of file
+    shell = ShellDF038(filename)
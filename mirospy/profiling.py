@@ -0,0 +1,141 @@
+"""
+Opt-in stage timing of the parsers:
+    profiling.enable()
+    records = ingest('/data/miros/1095')
+    print(profiling.report())
+or from the command line:
+    python -m mirospy.wrapper /data/miros/1095 --profile
+Each stage (e.g. 'df022.tokenize') adds its calls, wall time, bytes read,
+values decoded and, with enable(allocations=True), the net growth of
+traced memory to a registry of the current process. Stages may nest, an
+outer stage includes the time of the stages it contains. Profiling can
+also be switched on for a whole process with MIROSPY_PROFILE=1 (or
+MIROSPY_PROFILE=alloc to trace allocations too).
+"""
+import os
+import time
+import tracemalloc
+
+FIELDS = ('calls', 'seconds', 'bytes', 'values', 'allocated')
+
+_enabled = False
+_allocations = False
+_started_tracemalloc = False
+_stats = {}
+
+
+def enable(allocations=False):
+    """Start recording stages, allocations uses tracemalloc and is slow"""
+    global _enabled, _allocations, _started_tracemalloc
+    _enabled = True
+    _allocations = allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+
+def disable():
+    """Stop recording, the stats recorded so far are kept"""
+    global _enabled, _allocations, _started_tracemalloc
+    _enabled = False
+    _allocations = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+def is_enabled():
+    return _enabled
+
+def traces_allocations():
+    return _allocations
+
+def reset():
+    _stats.clear()
+
+def get_stats():
+    """{stage: {'calls', 'seconds', 'bytes', 'values', 'allocated'}}, a copy"""
+    return dict((name, dict(entry)) for name, entry in _stats.items())
+
+def record(name, seconds=0., nbytes=0, nvalues=0, allocated=0, calls=1):
+    """Add to the stats of a stage, also when profiling is not enabled"""
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = dict.fromkeys(FIELDS, 0)
+    entry['calls'] += calls
+    entry['seconds'] += seconds
+    entry['bytes'] += nbytes
+    entry['values'] += nvalues
+    entry['allocated'] += allocated
+
+def merge(stats):
+    """Add stats from get_stats() of another process to this registry"""
+    for name, entry in stats.items():
+        record(name, entry['seconds'], entry['bytes'], entry['values'],
+               entry['allocated'], entry['calls'])
+
+
+class _Stage(object):
+    __slots__ = ('name', 'bytes', 'values', '_start', '_memory')
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.values = 0
+
+    def __enter__(self):
+        self._memory = tracemalloc.get_traced_memory()[0] if _allocations else 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter()-self._start
+        allocated = 0
+        if _allocations and tracemalloc.is_tracing():
+            allocated = tracemalloc.get_traced_memory()[0]-self._memory
+        record(self.name, seconds, self.bytes, self.values, allocated)
+        return False
+
+
+def _dropped(self, value):
+    pass
+
+class _NullStage(object):
+    # stand-in while profiling is off, bytes/values read as 0 and values
+    # set on it are dropped, so nothing carries over between stages
+    __slots__ = ()
+    bytes = property(lambda self: 0, _dropped)
+    values = property(lambda self: 0, _dropped)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """
+    Context manager timing a stage, set .bytes and .values on it:
+        with profiling.stage('df022.read') as st:
+            text = openfile.read()
+            st.bytes = len(text)
+    """
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+def report(stats=None):
+    """Text table of stats (default: this process), slowest stage first"""
+    stats = get_stats() if stats is None else stats
+    lines = ['%-28s %8s %10s %10s %12s %12s %12s'
+             % ('stage', 'calls', 'seconds', 'us/call', 'bytes', 'values',
+                'allocated')]
+    for name, entry in sorted(stats.items(), key=lambda item: -item[1]['seconds']):
+        lines.append('%-28s %8d %10.4f %10.1f %12d %12d %12d'
+                     % (name, entry['calls'], entry['seconds'],
+                        1e6*entry['seconds']/max(entry['calls'], 1),
+                        entry['bytes'], entry['values'], entry['allocated']))
+    return '\n'.join(lines)
+
+
+if os.environ.get('MIROSPY_PROFILE'):
+    enable(allocations=os.environ['MIROSPY_PROFILE'] == 'alloc')
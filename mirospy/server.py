@@ -0,0 +1,112 @@
+"""
+Receive DF022 telegrams pushed by Miros installations over TCP:
+    async def publish(data):
+        ...
+    server = TelegramServer(publish, port=4001)
+    await server.start()
+    await server.serve_forever()
+or from the command line:
+    python -m mirospy.server --port 4001
+Every connection has its own StreamDF022, telegrams are parsed as soon as
+their terminator arrives, in a worker thread so parsing never blocks the
+event loop, and handed to the callback.
+"""
+import argparse
+import asyncio
+import logging
+
+import numpy as np
+
+from .parsers.df022 import StreamDF022
+
+READ_BYTES = 65536
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramServer(object):
+    """
+    asyncio TCP server parsing the DF022 telegrams of many connections:
+    - callback: function or coroutine function called with each parsed
+      telegram, its filename is the 'host:port' of the sender; errors it
+      raises are logged and the connection carries on
+    - host, port: address to listen on, port 0 picks a free port
+    - missing_values, dtype, max_size: as for StreamDF022
+    """
+    def __init__(self, callback, host=None, port=4001,
+                 missing_values=('-999.99','-999.88','-999.77'),
+                 dtype=np.float64, max_size=2**20):
+        super(TelegramServer, self).__init__()
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.missing_values = missing_values
+        self.dtype = dtype
+        self.max_size = max_size
+        self.server = None
+        # peer -> StreamDF022 of the open connections
+        self.streams = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host,
+                                                 self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        peer = '%s:%s' % writer.get_extra_info('peername')[:2]
+        stream = self.streams[peer] = StreamDF022(
+            self.missing_values, self.dtype, peer, self.max_size)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await reader.read(READ_BYTES)
+                if not chunk:
+                    break
+                for data in await loop.run_in_executor(None, stream.feed, chunk):
+                    try:
+                        result = self.callback(data)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception:
+                        logger.exception('%s: callback failed for the %s telegram',
+                                         peer, data.header['datetime'])
+        except ConnectionError as error:
+            logger.warning('%s: %s', peer, error)
+        finally:
+            del self.streams[peer]
+            if stream.dropped or stream.errors:
+                logger.warning('%s: %d telegrams dropped, %d unreadable',
+                               peer, stream.dropped, stream.errors)
+            writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Print DF022 telegrams pushed over TCP')
+    parser.add_argument('--host', default=None,
+                        help='address to listen on (default: all)')
+    parser.add_argument('--port', type=int, default=4001)
+    args = parser.parse_args(argv)
+
+    def show(data):
+        print('%s DF022 %s %s' % (data.header['datetime'].isoformat(),
+                                  data.header['site'], data.filename),
+              flush=True)
+
+    try:
+        asyncio.run(TelegramServer(show, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Integrated wave parameters of many spectra in one pass:
+    efth = load_df038('archive/LD1/')
+    params = integrated_stats(efth)
+    params['hs'], params['tp'], params['tm01'], params['tm02'], params['dm']
+Definitions follow wavespectra (hs with its high frequency tail, smooth
+tp from a parabolic fit around the peak, dm from the first directional
+moment), computed with NumPy on (..., freq, dir) arrays. The frequency
+and direction weights are built once per spectral grid.
+"""
+import numpy as np
+
+STAT_NAMES = ('hs', 'tp', 'tm01', 'tm02', 'dm')
+
+# stat -> (DF022 WM parameter, DF037 parameter code) reported by the sensor
+WM_PARAMS = {
+    'hs': ('Significant wave height', 'Hm0'),
+    'tp': ('Primary wave peak period', 'Tp1'),
+    'tm01': ('Mean period', 'Tm01'),
+    'tm02': ('Mean zero up-crossing period', 'Tm02'),
+    'dm': ('Total energy mean direction True', 'Dmt-t'),
+}
+WM_RELATIVE_DIRECTION = ('Total energy mean direction Relative', 'Dmt-r')
+
+_GRIDS = {}
+
+
+class SpectralStats(object):
+    """
+    Integrated parameters of spectra on one frequency/direction grid:
+        stats = SpectralStats(data.freqs, data.dirs)
+        params = stats(spectra)
+    - freqs, dirs: grid in Hz and degrees
+    - tail: add the f**-4 tail above the last frequency to hs, as
+      wavespectra does when the last frequency is above 0.333 Hz
+    - chunk: spectra reduced at a time, bounds the temporary arrays
+    """
+    def __init__(self, freqs, dirs, tail=True, chunk=8192):
+        super(SpectralStats, self).__init__()
+        self.freqs = np.asarray(freqs, dtype=float)
+        self.dirs = np.asarray(dirs, dtype=float)
+        self.chunk = chunk
+        df = np.gradient(self.freqs) if self.freqs.size > 1 else np.ones(1)
+        dd = abs(self.dirs[1]-self.dirs[0]) if self.dirs.size > 1 else 1.
+        # spectrum over direction -> energy, sin and cos moments per frequency
+        radians = np.radians(270.-self.dirs)
+        self.dir_weights = dd*np.stack([np.ones(self.dirs.size),
+                                        np.sin(radians), np.cos(radians)], axis=1)
+        # frequency moments m0, m1, m2 and m0 with the tail for hs
+        self.freq_weights = np.stack([df, df*self.freqs, df*self.freqs**2, df], axis=1)
+        if tail and self.freqs[-1] > 0.333:
+            self.freq_weights[-1, 3] += 0.25*self.freqs[-1]
+        self.df = df
+
+    def __call__(self, spectra):
+        """
+        {stat: array} for (..., freq, dir) spectra, one value per spectrum;
+        NaN where a spectrum has missing values or no peak (tp)
+        """
+        spectra = np.asarray(spectra)
+        shape = spectra.shape[:-2]
+        if spectra.shape[-2:] != (self.freqs.size, self.dirs.size):
+            raise ValueError('Spectra of shape %s do not match the %d x %d grid'
+                             % (spectra.shape, self.freqs.size, self.dirs.size))
+        flat = spectra.reshape(-1, self.freqs.size, self.dirs.size)
+        dtype = flat.dtype if flat.dtype.kind == 'f' else np.float64
+        dir_weights = self.dir_weights.astype(dtype)
+        # (spectrum, freq, [E(f), sin, cos]), the only pass over the spectra
+        reduced = np.empty((flat.shape[0], self.freqs.size, 3))
+        for start in range(0, flat.shape[0], self.chunk):
+            reduced[start:start+self.chunk] = \
+                flat[start:start+self.chunk].astype(dtype, copy=False) @ dir_weights
+        oned = reduced[:, :, 0]
+        m0, m1, m2, m0_tail = (oned @ self.freq_weights).T
+        msin, mcos = (reduced[:, :, 1:] * self.df[:, None]).sum(axis=1).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats = {
+                'hs': 4*np.sqrt(m0_tail),
+                'tp': _smooth_peak_period(oned, self.freqs),
+                'tm01': m0/m1,
+                'tm02': np.sqrt(m0/m2),
+                'dm': (270.-np.degrees(np.arctan2(msin, mcos))) % 360.,
+            }
+        return dict((name, value.reshape(shape)) for name, value in stats.items())
+
+def _smooth_peak_period(oned, freqs):
+    # peak of a parabola through the largest local maximum of E(f) and its
+    # neighbours, NaN without a local maximum inside the grid
+    if freqs.size < 3:
+        return np.full(oned.shape[0], np.nan)
+    inner = oned[:, 1:-1]
+    peaks = (inner > oned[:, :-2]) & (inner > oned[:, 2:])
+    ipeak = np.argmax(np.where(peaks, inner, 0), axis=1)+1
+    rows = np.arange(oned.shape[0])
+    e1, e2, e3 = oned[rows, ipeak-1], oned[rows, ipeak], oned[rows, ipeak+1]
+    f1, f2, f3 = freqs[ipeak-1], freqs[ipeak], freqs[ipeak+1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q12 = (e1-e2)/(f1-f2)
+        q13 = (e1-e3)/(f1-f3)
+        qa = (q13-q12)/(f3-f2)
+        tp = 2./(f1+f2-q12/qa)
+    tp[~peaks.any(axis=1)] = np.nan
+    return tp
+
+def grid_stats(freqs, dirs, tail=True):
+    """SpectralStats of a grid, built once and reused"""
+    freqs = np.asarray(freqs, dtype=float)
+    dirs = np.asarray(dirs, dtype=float)
+    key = (freqs.tobytes(), dirs.tobytes(), tail)
+    if key not in _GRIDS:
+        _GRIDS[key] = SpectralStats(freqs, dirs, tail)
+    return _GRIDS[key]
+
+def integrated_stats(efth, tail=True):
+    """
+    {stat: array} of a spectra DataArray with freq and dir coordinates,
+    e.g. from load_df038 or ParseDF038.spec2d, shaped like its other dims
+    """
+    efth = efth.transpose(..., 'freq', 'dir')
+    return grid_stats(efth['freq'].values, efth['dir'].values, tail)(efth.values)
+
+def wm_reference(data, relative=False):
+    """
+    {stat: array} reported by the sensor in a ParseDF022 (WM block, one
+    value per instance) or ParseDF037 (one value per time); relative
+    picks the direction relative to the heading instead of true
+    """
+    params = dict(WM_PARAMS)
+    if relative:
+        params['dm'] = WM_RELATIVE_DIRECTION
+    if hasattr(data, 'get_params'):
+        values = data.get_params([params[name][0] for name in STAT_NAMES])
+        return dict((name, values[params[name][0]]) for name in STAT_NAMES)
+    reference = {}
+    for name in STAT_NAMES:
+        code = params[name][1]
+        if code in data.codes:
+            reference[name] = data.get_param(code)
+        else:
+            reference[name] = np.full(data.times.size, np.nan)
+    return reference
+
+def compare(stats, reference, direction_offset=0.):
+    """
+    {stat: stats-reference} for the stats in both, directions as the
+    signed difference in [-180, 180) after adding direction_offset to the
+    reference (e.g. 180 where the sensor reports the opposite convention
+    to the "coming from" spectra of ParseDF038)
+    """
+    differences = {}
+    for name in STAT_NAMES:
+        if name in stats and name in reference:
+            difference = np.asarray(stats[name])-np.asarray(reference[name])
+            if name == 'dm':
+                difference = (difference-direction_offset+180.) % 360.-180.
+            differences[name] = difference
+    return differences
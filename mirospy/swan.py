@@ -0,0 +1,203 @@
+"""
+SWAN ASCII spectra files written block by block:
+    export_df038('archive/', 'boundary.spec')
+One file covers every time and every site of the DF038 input, sites
+without a record at a time are written as NODATA. The layout is that of
+wavespectra's SWAN writer, without building xarray objects.
+"""
+import gzip
+import heapq
+import os
+
+import numpy as np
+
+from . import profiling
+from .parsers.df038 import (ParseDF038, _direction_order, _find_files,
+                            _read_records, _record_spectrum, _record_time)
+from .wrapper import record_site
+
+EXCEPTION_VALUE = -99
+
+
+class SwanWriter(object):
+    """
+    Time-dependent SWAN spectra file, written one time block at a time:
+        with SwanWriter('out.spec', freqs, dirs, lons, lats) as swan:
+            swan.write(time, spectra)
+    - filename: output path, gzip compressed if it ends with .gz
+    - freqs, dirs: spectral grid in Hz and degrees
+    - lons, lats: one position per location
+    - id: text of the first comment line
+    """
+    def __init__(self, filename, freqs, dirs, lons, lats,
+                 id='Created by mirospy'):
+        super(SwanWriter, self).__init__()
+        self.filename = filename
+        self.freqs = np.asarray(freqs)
+        self.dirs = np.asarray(dirs)
+        self.lons = np.atleast_1d(lons)
+        self.lats = np.atleast_1d(lats)
+        self.ntimes = 0
+        if filename.endswith('.gz'):
+            self.openfile = gzip.open(filename, 'wt')
+        else:
+            self.openfile = open(filename, 'w')
+        # one spectrum as integer rows of %5.0f, like numpy.savetxt
+        self._rows = ('%5.0f'*self.dirs.size+'\n')*self.freqs.size
+        self._write_header(id)
+
+    def _write_header(self, id):
+        lines = ['%-40s%s' % ('SWAN   1', 'Swan standard spectral file'),
+                 '%-4s%s' % ('$', id), '%-4s' % '$',
+                 '%-40s%s' % ('TIME', 'time-dependent data'),
+                 '%6d%34s%s' % (1, '', 'time coding option'),
+                 '%-40s%s' % ('LONLAT', 'locations in spherical coordinates'),
+                 '%6d%34s%s' % (self.lons.size, '', 'number of locations')]
+        lines += ['  %f  %f' % (lon, lat) for lon, lat in zip(self.lons, self.lats)]
+        lines += ['%-40s%s' % ('AFREQ', 'absolute frequencies in Hz'),
+                  '%6d%34s%s' % (self.freqs.size, '', 'number of frequencies')]
+        lines += ['%11.5f' % freq for freq in self.freqs]
+        lines += ['%-40s%s' % ('NDIR', 'spectral nautical directions in degr'),
+                  '%6d%34s%s' % (self.dirs.size, '', 'number of directions')]
+        lines += ['%11.4f' % wdir for wdir in self.dirs]
+        lines += ['QUANT', '%6d%34s%s' % (1, '', 'number of quantities in table'),
+                  '%-40s%s' % ('VaDens', 'variance densities in m2/Hz/degr'),
+                  '%-40s%s' % ('m2/Hz/degr', 'unit'),
+                  '%3s%-37g%s' % ('', EXCEPTION_VALUE, 'exception value')]
+        self.openfile.write('\n'.join(lines)+'\n')
+
+    def write(self, time, spectra):
+        """
+        Write one time block:
+        - time: datetime of the block
+        - spectra: (location, freq, dir) array or list of (freq, dir)
+          arrays, a location with any NaN (or None in a list) is written
+          as NODATA
+        """
+        with profiling.stage('swan.write') as stage:
+            parts = ['%-40s%s\n' % (time.strftime('%Y%m%d.%H%M%S'), 'date and time')]
+            nvalues = 0
+            for spec in spectra:
+                factor = np.nan if spec is None else spec.max()/9998.
+                if np.isnan(factor):
+                    parts.append('NODATA\n')
+                elif factor <= 0:
+                    parts.append('ZERO\n')
+                else:
+                    parts.append('FACTOR\n    %0.8E\n' % factor)
+                    parts.append(self._rows % tuple((spec/factor).ravel().tolist()))
+                    nvalues += spec.size
+            self.openfile.write(''.join(parts))
+            stage.values = nvalues
+        self.ntimes += 1
+
+    def close(self):
+        self.openfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def _site_records(isite, sources):
+    # (time, isite, record) of a site's sources merged in time order; sources
+    # is [(first record time, filename or ParseDF038)] sorted, a record is a
+    # DATA line of a file or the ParseDF038 itself. A file is read once the
+    # merge reaches its first time so only files overlapping in time are
+    # held in memory together
+    heap = []
+    isource = 0
+    last = None
+    while heap or isource < len(sources):
+        if isource < len(sources) and (not heap or sources[isource][0] <= heap[0][0]):
+            first, source = sources[isource]
+            if isinstance(source, ParseDF038):
+                timed = [(first, isource, 0, source)]
+            else:
+                timed = sorted((_record_time(record), isource, irec, record)
+                               for irec, record in enumerate(_read_records(source)[1]))
+                if timed and last is not None and timed[0][0] < last:
+                    raise ValueError('%s has records before its first one (%s), '
+                                     'already exported from other files'
+                                     % (source, first))
+            for item in timed:
+                heapq.heappush(heap, item)
+            isource += 1
+            continue
+        time, _, _, record = heapq.heappop(heap)
+        last = time
+        yield time, isite, record
+
+def export_df038(sources, filename, id='Created by mirospy'):
+    """
+    Write every DATA record of DF038 files to one SWAN file:
+        export_df038('archive/', 'boundary.spec')
+    - sources: list of filenames or ParseDF038 objects, a glob pattern or a
+      directory searched recursively for *.DF038 files; every record of a
+      file is exported, a ParseDF038 (e.g. from read_records or ingest)
+      gives its own record only
+    - filename: output path, gzip compressed if it ends with .gz
+    - one location per site (Site_Id), positioned at its first record
+    - records are decoded and written time block by time block, memory
+      holds the files of a site whose times overlap, usually one; a file
+      with records before its first one that were already written from
+      other files raises ValueError
+    - returns the number of time blocks written
+    """
+    if isinstance(sources, str):
+        sources = _find_files(sources)
+    # headers and first records only, to lay out locations and file order;
+    # site -> [(first time, filename or ParseDF038, lon, lat)]
+    sites = {}
+    seen = set()
+    freqs = dirs = None
+    for source in sources:
+        if isinstance(source, ParseDF038):
+            data = source
+        elif os.path.abspath(source) in seen:
+            continue
+        else:
+            seen.add(os.path.abspath(source))
+            data = ParseDF038(source)
+        if freqs is None:
+            freqs, dirs, first = data.freqs, data.dirs, data.filename
+        elif not (np.array_equal(data.freqs, freqs) and np.array_equal(data.dirs, dirs)):
+            raise ValueError('Spectral grid of %s differs from %s'
+                             % (data.filename, first))
+        sites.setdefault(record_site(data), []).append(
+            (data.times, source, data.lon, data.lat))
+    if freqs is None:
+        raise ValueError('No DF038 files to export')
+
+    names = sorted(sites, key=str)
+    streams = []
+    for isite, name in enumerate(names):
+        sites[name].sort(key=lambda entry: entry[0])
+        streams.append(_site_records(isite, [entry[:2] for entry in sites[name]]))
+    idirs = _direction_order(dirs)
+
+    with SwanWriter(filename, freqs, dirs,
+                    [sites[name][0][2] for name in names],
+                    [sites[name][0][3] for name in names], id) as swan:
+        block_time = None
+        spectra = [None]*len(names)
+        for time, isite, record in heapq.merge(*streams,
+                                               key=lambda item: item[:2]):
+            if time != block_time:
+                if block_time is not None:
+                    swan.write(block_time, spectra)
+                block_time = time
+                spectra = [None]*len(names)
+            if spectra[isite] is not None:
+                # same site and time in two records, keep the first
+                continue
+            if isinstance(record, ParseDF038):
+                spectra[isite] = record.spec2d.values.reshape(freqs.size, dirs.size)
+            else:
+                spectra[isite] = _record_spectrum(record, freqs.size, dirs.size)[:, idirs]
+        if block_time is not None:
+            swan.write(block_time, spectra)
+        return swan.ntimes
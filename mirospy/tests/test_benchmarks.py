@@ -0,0 +1,39 @@
+import numpy as np
+
+from ..benchmarks import run, synthetic
+from ..parsers import df022, df037, df038
+
+def test_synthetic_archive(tmpdir):
+    files = synthetic.make_archive(str(tmpdir), nfiles=2, records=3,
+                                   nfreq=20, ndirs=24)
+    data = df022.ParseDF022(files['DF022'][0])
+    assert sorted(data.data_blocks) == sorted(synthetic.DF022_INSTANCES)
+    assert len(data.data_blocks['VN']) == 4
+    assert data.get_param('Sensor Height') == [69.0, 69.0]
+    assert data.data_blocks['CV'].values.shape == (2, 15)
+    with open(files['DF022'][0]) as openfile:
+        content = openfile.read()
+    assert all(missing in content for missing in synthetic.MISSING_VALUES)
+    assert not np.isin(data.data_blocks['WM'].values, [-999.99, -999.88, -999.77]).any()
+    assert df037.ParseDF037(files['DF037'][1]).values.shape == (3, 43)
+    efth = df038.load_df038(files['DF038'])
+    assert efth.shape == (6, 20, 24)
+    assert np.isfinite(efth.values).all()
+
+def test_run_suite_selected_setup(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('setup of a case that does not run')
+    monkeypatch.setattr(df038, 'load_df038', fail)
+    monkeypatch.setattr(df022.ParseDF022, '__init__', fail)
+    results = run.run_suite(nfiles=2, repeat=1, cases=['df037_parse'])
+    assert list(results['results']) == ['df037_parse']
+
+def test_run_suite_and_compare():
+    results = run.run_suite(nfiles=3, nswan=1, repeat=1,
+                            cases=['df022_parse', 'df038_load'])
+    assert sorted(results['results']) == ['df022_parse', 'df038_load']
+    assert results['results']['df022_parse']['files'] == 3
+    assert run.compare(results, results) == []
+    faster = {'results': dict((name, dict(result, files_per_s=result['files_per_s']*2))
+                              for name, result in results['results'].items())}
+    assert len(run.compare(results, faster)) == 2
@@ -0,0 +1,93 @@
+from os.path import *
+import os
+import shutil
+
+import numpy as np
+
+from ..cache import ParseCache
+from ..parsers import df022, df038
+
+HERE = dirname(abspath(__file__))
+
+def test_df022_cache(tmpdir):
+    cache = ParseCache(str(tmpdir.join('cache')))
+    filename = join(HERE,'data/MIR_All_NOW.DF022')
+    cold = df022.ParseDF022(filename, cache=cache)
+    warm = df022.ParseDF022(filename, cache=cache)
+    assert not warm.data_blocks['VM'].values.flags.writeable
+    assert warm.header == cold.header
+    assert warm.data_blocks == cold.data_blocks
+    np.testing.assert_array_equal(
+        warm.get_params(['Average Heading'])['Average Heading'],
+        cold.get_params(['Average Heading'])['Average Heading'])
+
+def test_df038_cache(tmpdir):
+    cache = ParseCache(str(tmpdir.join('cache')))
+    filename = join(HERE,'data/MIR_LD1_NOW.DF038')
+    cold = df038.ParseDF038(filename, cache=cache)
+    np.testing.assert_array_equal(cold.spec2d.values,
+                                  df038.ParseDF038(filename).spec2d.values)
+    warm = df038.ParseDF038(filename, cache=cache)
+    assert warm._cached is not None
+    assert (warm.times, warm.lon, warm.lat) == (cold.times, cold.lon, cold.lat)
+    np.testing.assert_array_equal(warm.spec2d.values, cold.spec2d.values)
+
+def test_stacked_cache(tmpdir):
+    cache = ParseCache(str(tmpdir.join('cache')))
+    files = [join(HERE,'data/MIR_LD1_NOW.DF038')]
+    cold = df038.load_df038(files, cache=cache)
+    warm = df038.load_df038(files, cache=cache)
+    assert not warm.values.flags.writeable
+    np.testing.assert_array_equal(warm.values, cold.values)
+    assert (warm.time.values == cold.time.values).all()
+    files = [join(HERE,'data/MIR_All_NOW.DF022')]
+    cold = df022.load_df022(files, cache=cache)
+    warm = df022.load_df022(files, cache=cache)
+    assert warm.identical(cold)
+
+def test_stacked_cache_new_file(tmpdir, monkeypatch):
+    cache = ParseCache(str(tmpdir.join('cache')))
+    decoded = []
+    decode_file = df038._decode_file
+    monkeypatch.setattr(df038, '_decode_file',
+                        lambda filename, idirs=None: decoded.append(filename) or
+                                                     decode_file(filename, idirs))
+    parsed = []
+    read_blocks = df022.ParseDF022._read_data_blocks
+    monkeypatch.setattr(df022.ParseDF022, '_read_data_blocks',
+                        lambda self, tokens: parsed.append(self.filename) or
+                                             read_blocks(self, tokens))
+    filenames = {}
+    for name in ('LD1_NOW.DF038', 'All_NOW.DF022'):
+        filenames[name] = []
+        for i in range(3):
+            filename = str(tmpdir.join('%d_%s' % (i, name)))
+            shutil.copy(join(HERE,'data/MIR_'+name), filename)
+            filenames[name].append(filename)
+    df038.load_df038(filenames['LD1_NOW.DF038'][:2], cache=cache)
+    df022.load_df022(filenames['All_NOW.DF022'][:2], cache=cache)
+    assert len(decoded) == len(parsed) == 2
+    # one file added, only that one is parsed from text
+    efth = df038.load_df038(filenames['LD1_NOW.DF038'], cache=cache)
+    ds = df022.load_df022(filenames['All_NOW.DF022'], cache=cache)
+    assert decoded[2:] == filenames['LD1_NOW.DF038'][2:]
+    assert parsed[2:] == filenames['All_NOW.DF022'][2:]
+    assert efth.dtype == np.float32
+    np.testing.assert_array_equal(efth.values,
+                                  df038.load_df038(filenames['LD1_NOW.DF038']).values)
+    assert ds.identical(df022.load_df022(filenames['All_NOW.DF022']))
+
+def test_cache_invalidation_and_eviction(tmpdir):
+    cache = ParseCache(str(tmpdir.join('cache')), max_size=25000)
+    filenames = []
+    for i in range(3):
+        filename = str(tmpdir.join('%d.DF038' % i))
+        shutil.copy(join(HERE,'data/MIR_LD1_NOW.DF038'), filename)
+        os.utime(filename, (i, i))
+        filenames.append(filename)
+        df038.ParseDF038(filename, cache=cache).spec2d
+    assert cache.total_size() <= 25000
+    assert cache.get(filenames[0], df038.CACHE_KIND) is None
+    assert cache.get(filenames[2], df038.CACHE_KIND) is not None
+    os.utime(filenames[2], (10, 10))
+    assert cache.get(filenames[2], df038.CACHE_KIND) is None
@@ -0,0 +1,56 @@
+from os.path import *
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from .. import derived
+from ..parsers import df022
+
+HERE = dirname(abspath(__file__))
+
+def test_conversions():
+    np.testing.assert_allclose(derived.degmin_to_degrees([24146.88, 18250.00, 17670.]),
+                               [61+46.88/60, 2+50/60., -3.5])
+    assert np.isnan(derived.degmin_to_degrees([np.nan]))[0]
+    np.testing.assert_allclose(derived.relative_to_true([312., 10.], 319.28),
+                               [271.28, 329.28])
+    speed = derived.wind_at_10m(np.array([9.64, np.nan]), 69., 0.13)
+    assert speed[0] == pytest.approx(7.50, abs=0.005)
+    assert np.isnan(speed[1])
+
+def test_derived_dataset():
+    files = [join(HERE,'data/MIR_All_NOW.DF022')]*2
+    calc = derived.Derived(df022.load_df022(files))
+    assert 'Latitude decimal' in calc
+    assert 'Vessel heading' in calc.names
+    assert calc._values == {}
+    wind = calc['Aver. Wind Speed True Last 2 min 10m level from sensor level']
+    assert wind.dims == ('time', 'instance')
+    assert wind.attrs['units'] == 'm/s'
+    np.testing.assert_allclose(wind.values[:, [0, 4]], 7.4994, atol=1e-4)
+    assert np.isnan(wind.values[:, 1:4]).all()
+    assert sorted(calc._values) == ['Aver. Wind Speed True Last 2 min 10m level from sensor level']
+    direction = calc['Aver. Wind Direction True from heading Last 2 min']
+    np.testing.assert_allclose(direction.values[:, 0], 271.28)
+    assert calc['Vessel heading'].dims == ('time',)
+    assert calc['Latitude decimal'].values[0, 0] == pytest.approx(61.7813333)
+    assert calc['Latitude decimal'] is calc['Latitude decimal']
+    ds = calc.to_dataset(['Longitude decimal'])
+    assert ds['Longitude decimal'].values[1, 0] == pytest.approx(2.8333333)
+    with pytest.raises(KeyError):
+        calc['Latitude']
+
+def test_heading_fallback():
+    dims = ('time', 'instance')
+    ds = xr.Dataset({'Vessel Heading True - Average': (dims, [[np.nan], [10.], [np.nan]]),
+                     'Vessel Heading 1 min mean': (dims, [[20.], [30.], [np.nan]]),
+                     'Primary wave peak direction Relative': (dims, [[5.], [355.], [1.]])},
+                    coords={'time': [0, 1, 2], 'instance': [1]})
+    calc = derived.Derived(ds)
+    np.testing.assert_array_equal(calc['Vessel heading'].values, [20., 10., np.nan])
+    true = calc['Primary wave peak direction True from heading'].values[:, 0]
+    np.testing.assert_array_equal(true, [25., 5., np.nan])
+    assert 'Latitude decimal' not in calc
+    ds = ds.drop_vars('Vessel Heading True - Average')
+    assert 'Vessel heading' in derived.Derived(ds)
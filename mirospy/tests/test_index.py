@@ -0,0 +1,94 @@
+from os.path import *
+import datetime
+import os
+import shutil
+import sqlite3
+
+from .. import index
+from ..parsers import df022
+
+HERE = dirname(abspath(__file__))
+
+def _archive(tmpdir):
+    root = str(tmpdir.join('archive'))
+    shutil.copytree(join(HERE,'data'), join(root, 'a'))
+    shutil.copytree(join(HERE,'data'), join(root, 'b'))
+    path = join(root, 'b', 'MIR_All_NOW.DF022')
+    with open(path) as src:
+        content = src.read()
+    with open(path, 'w') as dst:
+        dst.write(content.replace('20:50', '21:50', 1))
+    return root
+
+def test_update_and_query(tmpdir):
+    root = _archive(tmpdir)
+    archive = index.ArchiveIndex(str(tmpdir.join('index.sqlite')))
+    assert archive.update(root) == 8
+    assert archive.update(root) == 0
+    paths = archive.paths(site='1095', blocks=['VN'])
+    assert [basename(dirname(p)) for p in paths] == ['a', 'b']
+    start = datetime.datetime(2017, 3, 22, 21)
+    data = archive.query(site='1095', start=start, blocks=['VN', 'WM'])
+    assert len(data) == 1
+    assert isinstance(data[0], df022.ParseDF022)
+    assert data[0].header['datetime'].hour == 21
+    assert len(archive.paths(formats=['DF038'])) == 2
+    assert archive.paths(site='WVX', blocks=['WM'], formats=['DF037'])
+    assert archive.paths(site='1095', blocks=['XX']) == []
+
+def test_incremental_update(tmpdir):
+    root = _archive(tmpdir)
+    archive = index.ArchiveIndex(str(tmpdir.join('index.sqlite')))
+    archive.update(root)
+    shutil.rmtree(join(root, 'a'))
+    os.utime(join(root, 'b', 'MIR_WM1_NOW.DF037'), (0, 0))
+    assert archive.update(root) == 1
+    assert len(archive.paths()) == 4
+    archive.close()
+    reopened = index.ArchiveIndex(str(tmpdir.join('index.sqlite')))
+    assert len(reopened.paths(site='1095')) == 2
+
+def test_time_ranges(tmpdir):
+    root = tmpdir.mkdir('ranges')
+    with open(join(HERE,'data/MIR_WM1_NOW.DF037')) as src:
+        lines = src.read().rstrip('\r\n').splitlines()
+    record = lines[-1]
+    lines[-1:] = ['2017-%s%s' % (day, record[10:]) for day in
+                  ('03-01', '03-15', '04-29')]
+    with open(str(root.join('WM1.DF037')), 'w') as dst:
+        dst.write('\n'.join(lines)+'\n')
+    with open(join(HERE,'data/MIR_LD1_NOW.DF038')) as src:
+        lines = src.read().splitlines()
+    record = lines[-1]
+    lines[-1:] = [time+record[19:] for time in
+                  ('2017-03-22 20:56:02', '2017-03-25 20:56:02')]
+    with open(str(root.join('LD1.DF038')), 'w') as dst:
+        dst.write('\n'.join(lines)+'\n')
+    archive = index.ArchiveIndex(str(tmpdir.join('index.sqlite')))
+    assert archive.update(str(root)) == 2
+    april = archive.paths(start=datetime.datetime(2017, 4, 1),
+                          end=datetime.datetime(2017, 4, 10))
+    assert [basename(p) for p in april] == ['WM1.DF037']
+    march = archive.paths(start=datetime.datetime(2017, 3, 24),
+                          end=datetime.datetime(2017, 3, 24, 12))
+    assert [basename(p) for p in march] == ['WM1.DF037', 'LD1.DF038']
+    assert archive.paths(end=datetime.datetime(2017, 2, 28)) == []
+    records = archive.query(start=datetime.datetime(2017, 3, 25),
+                            end=datetime.datetime(2017, 3, 25, 23))
+    assert [r.times for r in records] == [datetime.datetime(2017, 3, 25, 20, 56, 2)]
+    assert records[0].spec2d.shape == (1, 1, 1, 32, 36)
+    records = archive.query(start=datetime.datetime(2017, 3, 10),
+                            end=datetime.datetime(2017, 3, 23))
+    assert [type(r).__name__ for r in records] == ['ParseDF037', 'ParseDF038']
+    assert records[0].times.tolist() == [datetime.datetime(2017, 3, 15, 20, 56, 2)]
+    assert records[0].values.shape == (1, 43)
+    assert records[1].times == datetime.datetime(2017, 3, 22, 20, 56, 2)
+
+def test_old_schema_rebuilt(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE files (path TEXT PRIMARY KEY, time INTEGER)')
+    connection.commit()
+    connection.close()
+    archive = index.ArchiveIndex(path)
+    assert archive.update(_archive(tmpdir)) == 8
@@ -1,10 +1,11 @@
 from os.path import *
 import datetime
 
+import numpy as np
 import pytest
 import xarray as xr
 
-from ..parsers import df038, df022
+from ..parsers import df025, df037, df038, df022
 
 HERE = dirname(abspath(__file__))
 
@@ -12,12 +13,27 @@ def test_read_df038():
     data = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038'))
     assert isinstance(data.spec2d, xr.DataArray)
 
+def test_read_df038_lazy():
+    data = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038'))
+    assert data.times == datetime.datetime(2017, 3, 22, 20, 56, 2)
+    assert data.lat == pytest.approx(61.7813333)
+    assert data.dictshell['Number_Of_Frequencies'] == '032'
+    assert data._spec2d is None
+    assert data.spec2d is data.spec2d
+    assert data.spec2d.shape == (1, 1, 1, 32, 36)
+
 def test_read_df022_header():
     data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
     assert isinstance(data.header['datetime'], datetime.datetime)
     assert data.header['data_format'] == 'DF022'
     assert data.header['site'] == '1095'
 
+def test_read_df022_header_only():
+    data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'), header_only=True)
+    assert data.header['datetime'] == datetime.datetime(2017, 3, 22, 20, 50)
+    assert data.header['site'] == '1095'
+    assert data.data_blocks == {}
+
 def test_read_df022_blocks():
     data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
     assert len(data.data_blocks['WM']) == 2
@@ -25,6 +41,55 @@ def test_read_df022_blocks():
         assert len(vals) == 43
     assert data.data_blocks['CV'][0][1] == None
     assert data.data_blocks['CV'][1][0] == 0.04
+    assert len(data.data_blocks['VN'][2]) == 19
+    assert data.data_blocks['WA'][1] == []
+    assert data.data_blocks['WA'][4][0] == 69.0
+    assert not hasattr(data, 'raw_lines')
+
+def test_df022_block_arrays():
+    data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
+    block = data.data_blocks['VM']
+    assert isinstance(block, df022.DataBlock)
+    assert block.values.shape == (4, 17)
+    assert block.values[:2, 7].tolist() == [-125.66, -121.72]
+    assert np.isnan(block.values[2, 7])
+    assert block.tolist() == list(block)
+    assert data.data_blocks['WA'].lengths[1] == 0
+    small = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'),
+                             dtype=np.float32)
+    assert small.data_blocks['VM'].values.dtype == np.float32
+    np.testing.assert_allclose(small.get_params(['Average Heading'])['Average Heading'],
+                               data.get_params(['Average Heading'])['Average Heading'],
+                               rtol=1e-6)
+
+def test_df022_bad_block_count():
+    # counts that cannot hold the block id fall back to scanning
+    for block_id in (b'TH1-000', b'TH1-001'):
+        text = b'!!!!\nDF022\n1095\n22-03-2017\n20:50\n'+block_id+ \
+               b'\n1.0\nVH1-002\n319.28\n$$$$$$$\n'
+        data = df022.ParseDF022('test', text=text)
+        assert data.data_blocks['TH'] == [[1.0]]
+        assert data.data_blocks['VH'] == [[319.28]]
+
+def test_stream_df022():
+    filename = join(HERE,'data/MIR_All_NOW.DF022')
+    with open(filename, 'rb') as openfile:
+        text = openfile.read()
+    whole = df022.ParseDF022(filename)
+    # noise, a telegram cut short by a new one, then two full telegrams
+    feed = b'noise\r\n'+text[:2000]+text+text.replace(b'20:50', b'20:51')
+    stream = df022.StreamDF022(filename='test')
+    telegrams = []
+    for start in range(0, len(feed), 97):
+        telegrams += stream.feed(feed[start:start+97])
+    assert [t.header['datetime'].minute for t in telegrams] == [50, 51]
+    assert stream.dropped == 1 and stream.errors == 0
+    assert telegrams[0].filename == 'test'
+    assert telegrams[0].data_blocks == whole.data_blocks
+    # emitted as soon as the terminator arrives
+    end = text.index(df022.END_MARK)+len(df022.END_MARK)
+    assert stream.feed(text[:end-1]) == []
+    assert len(stream.feed(text[end-1:end])) == 1
 
 def test_get_available_blocks():
     data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
@@ -35,4 +100,132 @@ def test_get_param():
     assert data.get_param('Air Temperature (1 min. mean)') == [2.94]
     assert data.get_param('Average Heading') == [-125.66, -121.72, None, -122.94]
     assert data.get_param('Air Temperature (1 min. mean)') == [2.94]
-    assert data.get_param('Cloud Level 1 (lowest cloud) (2min)',True) == ([1331.26],'m/s')
\ No newline at end of file
+    assert data.get_param('Cloud Level 1 (lowest cloud) (2min)',True) == ([1331.26],'m/s')
+
+def _df022_copy(tmpdir, name, time):
+    with open(join(HERE,'data/MIR_All_NOW.DF022')) as src:
+        lines = src.readlines()
+    lines[4] = time+'\n'
+    path = join(str(tmpdir), name)
+    with open(path, 'w') as dst:
+        dst.writelines(lines)
+    return path
+
+def test_load_df022(tmpdir):
+    files = [_df022_copy(tmpdir, 'b.DF022', '20:52'),
+             _df022_copy(tmpdir, 'a.DF022', '20:51')]
+    ds = df022.load_df022(files)
+    assert ds.sizes == {'time': 2, 'instance': 5}
+    assert str(ds.time.values[0]) == '2017-03-22T20:51:00'
+    temp = ds['Air Temperature (1 min. mean)']
+    assert temp.attrs['units'] == u'°C'
+    assert temp.values[0, 0] == 2.94
+    assert np.isnan(temp.values[:, 1:]).all()
+    assert np.isnan(ds['Average Heading'].values[1, 2])
+    assert ds['Average Heading'].values[1, 3] == -122.94
+
+def test_load_df022_wider_later(tmpdir):
+    # the widest block (WA5) only arrives with the second file
+    narrow = join(str(tmpdir), 'narrow.DF022')
+    with open(narrow, 'wb') as dst:
+        dst.write(b'!!!!\nDF022\n1095\n22-03-2017\n20:53\nVH1-002\n319.28\n$$$$$$$\n')
+    files = [narrow, _df022_copy(tmpdir, 'b.DF022', '20:52'),
+             _df022_copy(tmpdir, 'a.DF022', '20:51')]
+    ds = df022.load_df022(files)
+    assert ds.sizes == {'time': 3, 'instance': 5}
+    assert str(ds.time.values[-1]) == '2017-03-22T20:53:00'
+    np.testing.assert_array_equal(ds['Vessel Heading 1 min mean'].values[:, 0], 319.28)
+    assert np.isnan(ds['Vessel Heading 1 min mean'].values[:, 1:]).all()
+    assert np.isnan(ds['Average Heading'].values[2]).all()
+    assert ds['Average Heading'].values[1, 3] == -122.94
+
+def test_load_df022_glob(tmpdir):
+    _df022_copy(tmpdir, 'a.DF022', '20:51')
+    _df022_copy(tmpdir, 'b.DF022', '20:52')
+    ds = df022.load_df022(join(str(tmpdir), '*.DF022'))
+    assert ds.sizes['time'] == 2
+
+def test_get_params():
+    data = df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
+    values, units = data.get_params(['Average Heading',
+                                     'Air Temperature (1 min. mean)',
+                                     'Precipitation last fixed 3 hours'],
+                                    units=True)
+    np.testing.assert_array_equal(values['Average Heading'],
+                                  [-125.66, -121.72, np.nan, -122.94])
+    assert values['Air Temperature (1 min. mean)'].tolist() == [2.94]
+    assert values['Precipitation last fixed 3 hours'].shape == (0,)
+    assert units['Average Heading'] == 'deg'
+    with pytest.raises(KeyError):
+        data.get_params(['Not a parameter'])
+
+def _df038_copy(tmpdir, name, times):
+    with open(join(HERE,'data/MIR_LD1_NOW.DF038')) as src:
+        content = src.read().splitlines()
+    record = content[content.index('[DATA]')+1]
+    lines = content[:content.index('[DATA]')+1]
+    lines += [time+record[len(time):] for time in times]
+    path = join(str(tmpdir), name)
+    with open(path, 'w') as dst:
+        dst.write('\n'.join(lines)+'\n')
+    return path
+
+def test_load_df038(tmpdir):
+    _df038_copy(tmpdir, 'b.DF038', ['2017-03-22 21:00:02', '2017-03-22 20:59:02'])
+    _df038_copy(tmpdir, 'a.DF038', ['2017-03-22 20:58:02'])
+    efth = df038.load_df038(str(tmpdir))
+    assert efth.dims == ('time', 'freq', 'dir')
+    assert efth.dtype == np.float32
+    assert efth.time.size == 3
+    assert (np.diff(efth.time.values) > np.timedelta64(0)).all()
+    single = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038'))
+    np.testing.assert_allclose(efth.values[0], single.spec2d.values[0, 0, 0],
+                               rtol=1e-6)
+    assert efth.lat.values[0] == pytest.approx(single.lat)
+
+def test_read_df037():
+    data = df037.ParseDF037(join(HERE,'data/MIR_WM1_NOW.DF037'))
+    assert len(data.codes) == 43
+    assert data.values.shape == (1, 43)
+    assert data.identifiers['Sensor_Id'][0] == 'WM1 sensor'
+    assert data.get_param('Hm0', True) == (pytest.approx([2.3904168]), 'm')
+    assert str(data.times[0]) == '2017-03-22T20:56:02.000'
+    assert data.to_dataset()['Tp1'].attrs['units'] == 's'
+    assert list(data.to_dataframe().columns) == data.codes
+
+def test_read_df037_many_rows(tmpdir):
+    with open(join(HERE,'data/MIR_WM1_NOW.DF037')) as src:
+        content = src.read().rstrip('\r\n')
+    record = content.splitlines()[-1]
+    path = join(str(tmpdir), 'many.DF037')
+    with open(path, 'w') as dst:
+        dst.write(content+'\n'+record.replace('6.8592142E+0', '-999.99')+'\n')
+    data = df037.ParseDF037(path)
+    assert data.values.shape == (2, 43)
+    assert np.isnan(data.values[1, 0])
+    assert data.values[1, 1] == data.values[0, 1]
+
+def test_read_df037_header_only(tmpdir):
+    with open(join(HERE,'data/MIR_WM1_NOW.DF037')) as src:
+        content = src.read().rstrip('\r\n')
+    record = content.splitlines()[-1]
+    path = join(str(tmpdir), 'many.DF037')
+    with open(path, 'w') as dst:
+        dst.write(content+'\n'+'\n'.join(record.replace('20:56', '%d:56' % hour)
+                                         for hour in (21, 22, 23))+'\n')
+    data = df037.ParseDF037(path, header_only=True)
+    full = df037.ParseDF037(path)
+    assert full.times.size == 4
+    assert data.times.tolist() == full.times[[0, -1]].tolist()
+    assert data.codes == full.codes
+    assert data.identifiers == full.identifiers
+
+def test_read_df025():
+    data = df025.ParseDF025(join(HERE,'data/MIR_WaveDta_NOW.DF025'))
+    assert data.header['site'] == '1095'
+    assert data.header['datetime'] == datetime.datetime(2017, 3, 22, 20, 56)
+    assert data.header['latitude'] == pytest.approx(61.7813333)
+    assert data.header['longitude'] == pytest.approx(2.8333333)
+    assert data.data.shape == (64, 8)
+    assert data.data[0, 0] == -0.317
+    assert data.data[-1, -1] == 6.45e5
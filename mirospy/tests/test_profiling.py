@@ -0,0 +1,74 @@
+from os.path import *
+import shutil
+
+import pytest
+
+from .. import profiling, wrapper
+from ..parsers import df022, df038
+
+HERE = dirname(abspath(__file__))
+
+@pytest.fixture
+def profiled():
+    profiling.reset()
+    profiling.enable()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+def test_disabled_records_nothing():
+    profiling.reset()
+    with profiling.stage('test') as stage:
+        stage.bytes = 10
+    assert profiling.get_stats() == {}
+    with profiling.stage('test') as stage:
+        stage.values += 5
+        assert (stage.bytes, stage.values) == (0, 0)
+
+def test_parser_stages(profiled):
+    df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022'))
+    df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038')).spec2d
+    stats = profiling.get_stats()
+    assert stats['df022.read']['calls'] == 1
+    assert stats['df022.read']['bytes'] == getsize(join(HERE,'data/MIR_All_NOW.DF022'))
+    assert stats['df022.convert']['values'] == 470
+    assert stats['df038.spectrum']['values'] == 32*37
+    assert stats['df038.xarray']['seconds'] > 0
+    assert 'df022.xarray' not in stats
+
+def test_allocations():
+    profiling.reset()
+    profiling.enable(allocations=True)
+    try:
+        with profiling.stage('test'):
+            block = bytearray(10**6)
+    finally:
+        profiling.disable()
+    assert profiling.get_stats()['test']['allocated'] > 0.9*10**6
+    profiling.reset()
+
+def test_merge():
+    profiling.reset()
+    profiling.record('test', 1., nbytes=5)
+    profiling.merge({'test': dict(profiling.get_stats()['test'])})
+    assert profiling.get_stats()['test']['calls'] == 2
+    assert profiling.get_stats()['test']['bytes'] == 10
+    profiling.reset()
+
+def test_ingest_workers(profiled, tmpdir):
+    for sub in ('a', 'b'):
+        shutil.copytree(join(HERE,'data'), join(str(tmpdir), sub))
+    wrapper.ingest(str(tmpdir), workers=2, chunksize=3)
+    stats = profiling.get_stats()
+    assert stats['wrapper.sniff']['calls'] == 8
+    assert stats['df022.read']['calls'] == 2
+
+def test_main_profile(capsys):
+    profiling.reset()
+    wrapper.main([join(HERE,'data'), '-j', '1', '--profile'])
+    profiling.reset()
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 4
+    assert captured.err.splitlines()[0].split()[:2] == ['stage', 'calls']
+    assert 'df022.read' in captured.err
+    assert not profiling.is_enabled()
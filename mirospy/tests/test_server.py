@@ -0,0 +1,68 @@
+from os.path import *
+import asyncio
+import logging
+
+from .. import server
+
+HERE = dirname(abspath(__file__))
+
+async def _send(port, text, chunk=500):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for start in range(0, len(text), chunk):
+        writer.write(text[start:start+chunk])
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+def test_telegram_server():
+    with open(join(HERE,'data/MIR_All_NOW.DF022'), 'rb') as openfile:
+        text = openfile.read()
+    received = []
+
+    async def collect(data):
+        received.append(data)
+
+    async def run():
+        tcp = server.TelegramServer(collect, host='127.0.0.1', port=0)
+        await tcp.start()
+        await asyncio.gather(*[_send(tcp.port, text*2) for _ in range(5)])
+        for _ in range(100):
+            if len(received) == 10:
+                break
+            await asyncio.sleep(0.01)
+        await tcp.close()
+
+    asyncio.run(run())
+    assert len(received) == 10
+    assert set(d.header['site'] for d in received) == set(['1095'])
+    assert len(set(d.filename for d in received)) == 5
+    assert received[0].get_param('Air Temperature (1 min. mean)') == [2.94]
+
+def test_telegram_server_errors(caplog):
+    with open(join(HERE,'data/MIR_All_NOW.DF022'), 'rb') as openfile:
+        text = openfile.read()
+    malformed = [b'!!!!\nDF022\n1095\n22-03-2017\n20:50\nTH1-000\n1.0\n$$$$$$$\n',
+                 b'!!!!\nDF022\n1095\nnot a date\n$$$$$$$\n']
+    received = []
+
+    def collect(data):
+        received.append(data)
+        if len(received) == 1:
+            raise RuntimeError('publish failed')
+
+    async def run():
+        tcp = server.TelegramServer(collect, host='127.0.0.1', port=0)
+        await tcp.start()
+        await _send(tcp.port, b''.join(malformed)+text+
+                    text.replace(b'20:50', b'20:51'), chunk=40)
+        for _ in range(100):
+            if len(received) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await tcp.close()
+
+    with caplog.at_level(logging.WARNING, logger=server.__name__):
+        asyncio.run(run())
+    assert [d.header['datetime'].minute for d in received] == [50, 50, 51]
+    assert 'publish failed' in caplog.text
+    assert '1 unreadable' in caplog.text
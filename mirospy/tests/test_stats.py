@@ -0,0 +1,48 @@
+from os.path import *
+
+import numpy as np
+import pytest
+
+from .. import stats
+from ..benchmarks import synthetic
+from ..parsers import df022, df037, df038
+
+HERE = dirname(abspath(__file__))
+
+def test_matches_wavespectra():
+    efth = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038')).spec2d
+    params = stats.integrated_stats(efth)
+    assert params['hs'].shape == (1, 1, 1)
+    for name in stats.STAT_NAMES:
+        expected = float(getattr(efth.spec, name)().values.ravel()[0])
+        assert float(params[name].ravel()[0]) == pytest.approx(expected, rel=1e-6)
+
+def test_compare_with_sensor():
+    efth = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038')).spec2d
+    params = stats.integrated_stats(efth.isel(lat=0, lon=0))
+    reference = stats.wm_reference(df037.ParseDF037(join(HERE,'data/MIR_WM1_NOW.DF037')),
+                                   relative=True)
+    differences = stats.compare(params, reference, direction_offset=180.)
+    for name in ('hs', 'tp', 'tm01', 'tm02'):
+        assert abs(differences[name][0]) < 1e-3
+    assert abs(differences['dm'][0]) < 1e-3
+    reference = stats.wm_reference(df022.ParseDF022(join(HERE,'data/MIR_All_NOW.DF022')))
+    assert reference['hs'].tolist() == [2.31, 4.57]
+
+def test_batched():
+    freqs = 0.01*np.arange(40)
+    dirs = np.arange(0, 360, 15.)
+    spectra = np.array([[synthetic.spectrum(40, 24, fp=fp, dp=dp, hs=hs)
+                         for fp, dp, hs in ((0.08, 10., 1.), (0.12, 200., 3.))]]*3)
+    spectra[2, 1] = np.nan
+    calc = stats.grid_stats(freqs, dirs)
+    assert calc is stats.grid_stats(freqs, dirs)
+    params = calc(spectra.astype(np.float32))
+    assert params['hs'].shape == (3, 2)
+    single = calc(spectra[0, 1])
+    for name in stats.STAT_NAMES:
+        assert params[name][1, 1] == pytest.approx(float(single[name]), rel=1e-5)
+        assert np.isnan(params[name][2, 1])
+    assert params['hs'][0].tolist() == pytest.approx([1., 3.], rel=1e-2)
+    with pytest.raises(ValueError):
+        calc(spectra[..., :-1])
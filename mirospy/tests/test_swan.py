@@ -0,0 +1,107 @@
+from os.path import *
+import datetime
+
+import numpy as np
+import pytest
+from wavespectra import read_swan
+
+from .. import swan
+from ..benchmarks import synthetic
+from ..parsers import df038
+
+HERE = dirname(abspath(__file__))
+
+def test_matches_wavespectra(tmpdir):
+    filename = join(HERE,'data/MIR_LD1_NOW.DF038')
+    expected = str(tmpdir.join('wavespectra.spec'))
+    df038.ParseDF038(filename).shell2swan(expected)
+    written = str(tmpdir.join('mirospy.spec'))
+    assert swan.export_df038([filename], written, id='Created by wavespectra') == 1
+    with open(expected) as a, open(written) as b:
+        assert a.read() == b.read()
+
+def test_multi_site_export(tmpdir):
+    rng = np.random.default_rng(1)
+    start = datetime.datetime(2017, 3, 22)
+    minutes = lambda *offsets: [start+datetime.timedelta(minutes=m) for m in offsets]
+    files = []
+    for name, site, times in (('a2', 'A', minutes(3, 4)), ('a1', 'A', minutes(0, 1, 2)),
+                              ('b1', 'B', minutes(1, 3))):
+        files.append(str(tmpdir.join(name+'.DF038')))
+        synthetic.write_df038(files[-1], times, nfreq=10, ndirs=12, site=site, rng=rng)
+    output = str(tmpdir.join('out.spec'))
+    assert swan.export_df038(files, output) == 5
+
+    with open(output) as openfile:
+        assert openfile.read().count('NODATA') == 3
+    dset = read_swan(output, dirorder=False)
+    efth = dset.efth.values.reshape(5, 2, 10, 12)
+    site_a = df038.load_df038(files[:2]).values
+    site_b = df038.load_df038(files[2:]).values
+    np.testing.assert_allclose(efth[:, 0], site_a, atol=site_a.max()/9998., rtol=0)
+    np.testing.assert_allclose(efth[[1, 3], 1], site_b, atol=site_b.max()/9998., rtol=0)
+    assert np.isnan(efth[[0, 2, 4], 1]).all()
+
+def test_overlapping_files(tmpdir):
+    rng = np.random.default_rng(2)
+    start = datetime.datetime(2017, 3, 22)
+    minutes = lambda *offsets: [start+datetime.timedelta(minutes=m) for m in offsets]
+    files = []
+    for name, times in (('a1', minutes(0, 2, 4)), ('a2', minutes(1, 3)),
+                        ('a3', minutes(4, 5))):
+        files.append(str(tmpdir.join(name+'.DF038')))
+        synthetic.write_df038(files[-1], times, nfreq=10, ndirs=12, rng=rng)
+    output = str(tmpdir.join('out.spec'))
+    assert swan.export_df038(files, output) == 6
+    dset = read_swan(output, dirorder=False)
+    assert (dset.time.values == np.array(minutes(0, 1, 2, 3, 4, 5),
+                                         dtype='datetime64[ns]')).all()
+    expected = df038.load_df038(files).values
+    # the 04 minute record of a3 is a duplicate, a1 comes first
+    expected = expected[[0, 1, 2, 3, 4, 6]]
+    np.testing.assert_allclose(dset.efth.values.reshape(6, 10, 12), expected,
+                               atol=expected.max()/9998., rtol=0)
+
+    # a record earlier than the first of its file, after it was written
+    synthetic.write_df038(files[2], minutes(5, 0), nfreq=10, ndirs=12, rng=rng)
+    with pytest.raises(ValueError, match='a3.DF038'):
+        swan.export_df038(files, output)
+
+def test_grid_mismatch(tmpdir):
+    files = [str(tmpdir.join('a.DF038')), str(tmpdir.join('b.DF038'))]
+    synthetic.write_df038(files[0], [datetime.datetime(2017, 3, 22)], nfreq=10)
+    synthetic.write_df038(files[1], [datetime.datetime(2017, 3, 22)], nfreq=12)
+    sources = [df038.ParseDF038(f) for f in files]
+    with pytest.raises(ValueError) as error:
+        swan.export_df038(sources, str(tmpdir.join('out.spec')))
+    assert str(error.value) == 'Spectral grid of %s differs from %s' % tuple(files[::-1])
+
+def test_export_parsed_records(tmpdir):
+    start = datetime.datetime(2017, 3, 22)
+    times = [start+datetime.timedelta(minutes=m) for m in (2, 0, 1)]
+    source = str(tmpdir.join('a.DF038'))
+    synthetic.write_df038(source, times, nfreq=10, ndirs=12,
+                          rng=np.random.default_rng(3))
+    expected = str(tmpdir.join('files.spec'))
+    assert swan.export_df038([source, source], expected) == 3
+    written = str(tmpdir.join('records.spec'))
+    assert swan.export_df038(df038.read_records(source), written) == 3
+    with open(expected) as a, open(written) as b:
+        assert a.read() == b.read()
+    single = str(tmpdir.join('single.spec'))
+    assert swan.export_df038(df038.read_records(source)[1:2], single) == 1
+    assert read_swan(single, dirorder=False).time.values[0] == np.datetime64(times[1])
+
+def test_writer(tmpdir):
+    filename = str(tmpdir.join('out.spec'))
+    efth = synthetic.spectrum(10, 12)
+    freqs = 0.01*np.arange(10)
+    dirs = np.arange(0, 360, 30.)
+    with swan.SwanWriter(filename, freqs, dirs, [2.8], [61.8]) as writer:
+        writer.write(datetime.datetime(2017, 3, 22), [efth])
+        writer.write(datetime.datetime(2017, 3, 22, 1), [None])
+    assert writer.ntimes == 2
+    dset = read_swan(filename, dirorder=False)
+    np.testing.assert_allclose(dset.efth.values[0].reshape(10, 12), efth,
+                               atol=efth.max()/9998., rtol=0)
+    assert np.isnan(dset.efth.values[1]).all()
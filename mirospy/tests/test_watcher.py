@@ -0,0 +1,109 @@
+from os.path import *
+import asyncio
+import os
+import shutil
+
+from .. import watcher
+from ..parsers import df022, df037
+
+HERE = dirname(abspath(__file__))
+
+def _copy(tmpdir, name):
+    path = join(str(tmpdir), name)
+    shutil.copy(join(HERE,'data',name), path)
+    return path
+
+def _rewrite(path, old, new):
+    with open(path) as src:
+        content = src.read()
+    with open(path, 'w') as dst:
+        dst.write(content.replace(old, new, 1))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns+10**9))
+
+def test_poll_only_changes(tmpdir):
+    df022_path = _copy(tmpdir, 'MIR_All_NOW.DF022')
+    df038_path = _copy(tmpdir, 'MIR_LD1_NOW.DF038')
+    watch = watcher.Watcher([df022_path, df038_path])
+    assert len(watch.poll()) == 2
+    assert watch.poll() == []
+    # touched but same content
+    os.utime(df022_path, ns=(0, 10**9))
+    assert watch.poll() == []
+    # new values, same header timestamp
+    _rewrite(df022_path, '1331.26', '1331.27')
+    assert watch.poll() == []
+    # new record
+    _rewrite(df022_path, '20:50', '20:51')
+    records = watch.poll()
+    assert len(records) == 1
+    assert isinstance(records[0], df022.ParseDF022)
+    assert records[0].header['datetime'].minute == 51
+
+def test_poll_partial_writes(tmpdir):
+    df022_path = _copy(tmpdir, 'MIR_All_NOW.DF022')
+    df038_path = _copy(tmpdir, 'MIR_LD1_NOW.DF038')
+    watch = watcher.Watcher([df022_path, df038_path])
+    assert len(watch.poll()) == 2
+    updates = {}
+    for path, old, new in ((df022_path, b'20:50', b'20:51'),
+                           (df038_path, b'20:56:02', b'20:57:02')):
+        with open(path, 'rb') as src:
+            updates[path] = src.read().replace(old, new, 1)
+    # new records caught while being written, at a size the parsers
+    # accept (3000), reject (30, 5005) or that misses its last lines
+    for size in (30, 3000, 5005, -20):
+        for path, content in updates.items():
+            with open(path, 'wb') as dst:
+                dst.write(content[:size])
+        assert watch.poll() == []
+    for path, content in updates.items():
+        with open(path, 'wb') as dst:
+            dst.write(content)
+    records = watch.poll()
+    assert len(records) == 2
+    assert records[0].header['datetime'].minute == 51
+    assert len(records[0].data_blocks['WM']) == 2
+    assert records[1].spec2d.shape == (1, 1, 1, 32, 36)
+    assert watch.poll() == []
+
+def test_poll_df037_header_first(tmpdir, monkeypatch):
+    path = _copy(tmpdir, 'MIR_WM1_NOW.DF037')
+    watch = watcher.Watcher([path])
+    assert len(watch.poll()) == 1
+    parsed = []
+    read_data = df037.ParseDF037._read_data
+    monkeypatch.setattr(df037.ParseDF037, '_read_data',
+                        lambda self, lines: parsed.append(len(lines)) or
+                                            read_data(self, lines))
+    # new values, same rows times: header pass only
+    _rewrite(path, '6.8592142E+0', '6.8592143E+0')
+    assert watch.poll() == []
+    assert parsed == [1]
+    # a row appended
+    with open(path) as src:
+        record = src.read().rstrip('\r\n').splitlines()[-1]
+    with open(path, 'a') as dst:
+        dst.write(record.replace('20:56', '20:57')+'\n')
+    records = watch.poll()
+    assert records[0].values.shape == (2, 43)
+    assert parsed[1:] == [2, 2]
+
+def test_watch(tmpdir):
+    path = _copy(tmpdir, 'MIR_LD1_NOW.DF038')
+    seen = []
+
+    async def collect():
+        watch = watcher.Watcher([path], interval=0.01, callback=seen.append)
+        records = []
+        async for data in watch.watch():
+            records.append(data)
+            if len(records) == 1:
+                _rewrite(path, '20:56:02', '20:57:02')
+            else:
+                break
+        return records
+
+    records = asyncio.run(collect())
+    assert [r.times.minute for r in records] == [56, 57]
+    assert seen == records
@@ -0,0 +1,59 @@
+from os.path import *
+import datetime
+import shutil
+
+import numpy as np
+import pytest
+
+from .. import wrapper
+from ..parsers import df038
+
+HERE = dirname(abspath(__file__))
+
+def test_sniff_format():
+    assert wrapper.sniff_format(join(HERE,'data/MIR_All_NOW.DF022')) == 'DF022'
+    assert wrapper.sniff_format(join(HERE,'data/MIR_WaveDta_NOW.DF025')) == 'DF025'
+    assert wrapper.sniff_format(join(HERE,'data/MIR_WM1_NOW.DF037')) == 'DF037'
+    assert wrapper.sniff_format(join(HERE,'data/MIR_LD1_NOW.DF038')) == 'DF038'
+    assert wrapper.sniff_format(__file__) is None
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ingest(tmpdir, workers):
+    for sub in ('a', 'b'):
+        shutil.copytree(join(HERE,'data'), join(str(tmpdir), sub))
+    data = wrapper.ingest(str(tmpdir), workers=workers, chunksize=3)
+    assert len(data) == 8
+    times = [wrapper.record_time(d) for d in data]
+    assert times == sorted(times)
+    assert times[0] == datetime.datetime(2017, 3, 22, 20, 50)
+    spectra = [d for d in data if isinstance(d, df038.ParseDF038)]
+    assert all(d._spec2d is not None for d in spectra)
+
+def test_ingest_df038_records(tmpdir):
+    with open(join(HERE,'data/MIR_LD1_NOW.DF038')) as src:
+        lines = src.read().splitlines()
+    record = lines[-1]
+    lines[-1:] = [time+record[19:] for time in
+                  ('2017-03-22 20:58:02', '2017-03-22 20:57:02')]
+    with open(str(tmpdir.join('LD1.DF038')), 'w') as dst:
+        dst.write('\n'.join(lines)+'\n')
+    shutil.copy(join(HERE,'data/MIR_LD1_NOW.DF038'), str(tmpdir))
+    data = wrapper.ingest(str(tmpdir), workers=2, chunksize=1)
+    assert [d.times.minute for d in data] == [56, 57, 58]
+    single = df038.ParseDF038(join(HERE,'data/MIR_LD1_NOW.DF038'))
+    for d in data:
+        assert d._spec2d is not None
+        np.testing.assert_allclose(d.spec2d.values, single.spec2d.values, rtol=1e-6)
+    assert data[1].lat == pytest.approx(single.lat)
+
+def test_ingest_formats():
+    data = wrapper.ingest(join(HERE,'data'), workers=1, formats=['DF038'])
+    assert len(data) == 1
+    assert isinstance(data[0], df038.ParseDF038)
+    assert wrapper.record_site(data[0]) == 'WVX'
+
+def test_main(capsys):
+    wrapper.main([join(HERE,'data'), '-j', '1'])
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 4
+    assert out[0].split()[:3] == ['2017-03-22T20:50:00', 'DF022', '1095']
@@ -0,0 +1,128 @@
+"""
+Change-aware polling of continuously overwritten Miros *_NOW files:
+    async for data in Watcher(['/miros/MIR_All_NOW.DF022']).watch():
+        publish(data)
+"""
+import asyncio
+import logging
+import os
+import zlib
+
+from .parsers.df022 import END_MARK, ParseDF022
+from .parsers.df037 import ParseDF037
+from .parsers.df038 import ParseDF038
+from .wrapper import PARSERS, sniff_format
+
+HASH_BYTES = 4096
+# formats ending with an END_MARK line, incomplete until it is written
+TERMINATED = ('DF022', 'DF025')
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(filename):
+    """crc32 of the first and last HASH_BYTES of a file"""
+    with open(filename, 'rb') as openfile:
+        head = openfile.read(HASH_BYTES)
+        if len(head) == HASH_BYTES:
+            openfile.seek(0, os.SEEK_END)
+            size = openfile.tell()
+            openfile.seek(max(HASH_BYTES, size-HASH_BYTES))
+            head += openfile.read()
+    return zlib.crc32(head)
+
+def is_complete(filename):
+    """Whether a DF022/DF025 file ends with its END_MARK line"""
+    with open(filename, 'rb') as openfile:
+        openfile.seek(0, os.SEEK_END)
+        openfile.seek(max(0, openfile.tell()-64))
+        return openfile.read().rstrip().endswith(END_MARK)
+
+
+class Watcher(object):
+    """
+    Re-parse files only when they changed:
+    - paths: files to watch
+    - interval: seconds between polls
+    - callback: optional function or coroutine function called with each
+      new record
+    A file is re-read when its mtime or size changed and its content hash
+    differs; the header timestamp is then read on its own and the full
+    parse is skipped when it matches the last record of that file.
+    A file caught while being written (DF022/DF025 without their end mark,
+    or failing to parse) is left unrecorded and checked again on the next
+    poll.
+    """
+    def __init__(self, paths, interval=10., callback=None):
+        super(Watcher, self).__init__()
+        self.paths = list(paths)
+        self.interval = interval
+        self.callback = callback
+        # path -> (mtime_ns, size, hash, record time)
+        self.states = {}
+
+    def _header(self, filename, code):
+        # record time (first and last row times for DF037) and, when it is
+        # free, the lazily parsed object
+        if code == 'DF038':
+            data = ParseDF038(filename)
+            return data.times, data
+        if code in ('DF022', 'DF025'):
+            return ParseDF022(filename, header_only=True).header['datetime'], None
+        # DF037: rows appended to the file change the last time
+        return tuple(ParseDF037(filename, header_only=True).times.tolist()), None
+
+    def check(self, filename):
+        """Newly parsed record of filename, None if it did not change"""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            # missing or being replaced, try again on the next poll
+            return None
+        state = self.states.get(filename)
+        if state is not None and state[:2] == (stat.st_mtime_ns, stat.st_size):
+            return None
+        code = sniff_format(filename)
+        if code is None:
+            return None
+        digest = content_hash(filename)
+        if state is not None and state[2] == digest:
+            self.states[filename] = (stat.st_mtime_ns, stat.st_size, digest, state[3])
+            return None
+        try:
+            time, data = self._header(filename, code)
+            if state is not None and state[3] == time:
+                data = None
+            elif code in TERMINATED and not is_complete(filename):
+                return None
+            elif data is None:
+                data = PARSERS[code](filename)
+            elif code == 'DF038':
+                # decode now, a truncated record fails here and not later
+                data.spec2d
+        except (ValueError, IndexError, KeyError) as error:
+            logger.debug('%s: not readable yet (%s)', filename, error)
+            return None
+        self.states[filename] = (stat.st_mtime_ns, stat.st_size, digest, time)
+        return data
+
+    def poll(self):
+        """Check every path once, returns the new records"""
+        records = []
+        for filename in self.paths:
+            data = self.check(filename)
+            if data is not None:
+                records.append(data)
+        return records
+
+    async def watch(self):
+        """Async iterator over new records, polling every interval seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            for data in await loop.run_in_executor(None, self.poll):
+                if self.callback is not None:
+                    result = self.callback(data)
+                    if asyncio.iscoroutine(result):
+                        await result
+                yield data
+            await asyncio.sleep(self.interval)
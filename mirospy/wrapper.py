@@ -0,0 +1,174 @@
+"""
+Format detection and parallel ingestion of Miros data files:
+    records = ingest('/data/miros/1095', workers=32)
+or from the command line:
+    python -m mirospy.wrapper /data/miros/1095 -j 32
+With mirospy.profiling enabled the stage stats of the worker processes
+are merged into the stats of the calling process.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import functools
+import os
+import sys
+
+from . import profiling
+from .parsers.df022 import ParseDF022
+from .parsers.df025 import ParseDF025
+from .parsers.df037 import ParseDF037
+from .parsers.df038 import ParseDF038, read_records
+
+PARSERS = {
+    'DF022': ParseDF022,
+    'DF025': ParseDF025,
+    'DF037': ParseDF037,
+    'DF038': ParseDF038,
+}
+
+SNIFF_BYTES = 256
+
+
+def sniff_format(filename):
+    """Format code (e.g. 'DF022') from the first bytes of a file, or None"""
+    with profiling.stage('wrapper.sniff') as stage, \
+         open(filename, 'rb') as openfile:
+        head = openfile.read(SNIFF_BYTES)
+        stage.bytes = len(head)
+    if head.startswith(b'!!!!'):
+        # DF022 style header, format on the second line (DF022, DF-025/05)
+        lines = head.split(b'\n', 2)
+        code = lines[1].strip() if len(lines) > 1 else b''
+    elif head.lstrip().startswith(b'[GENERAL]'):
+        # ini style header, Miros_Format_No=DF-038
+        start = head.find(b'Miros_Format_No=')
+        if start < 0:
+            return None
+        code = head[start+16:].split(b'\n', 1)[0].strip()
+    else:
+        return None
+    code = code.replace(b'-', b'').split(b'/')[0].decode('latin-1')
+    return code if code in PARSERS else None
+
+def record_time(data):
+    """Timestamp of a parsed file, first record for multi-record formats"""
+    if isinstance(data, ParseDF038):
+        return data.times
+    if isinstance(data, ParseDF037):
+        if not data.times.size:
+            return datetime.datetime.min
+        return data.times[0].astype('datetime64[s]').astype(datetime.datetime)
+    return data.header['datetime']
+
+def record_site(data):
+    """Site identifier of a parsed file"""
+    if isinstance(data, ParseDF038):
+        return data.dictshell.get('Site_Id', data.dictshell.get('Site_Name'))
+    if isinstance(data, ParseDF037):
+        sites = data.identifiers.get('Site_Id') or [None]
+        return sites[0]
+    return data.header['site']
+
+def find_files(path):
+    """All files below path in a stable order, or [path] for a file"""
+    if not os.path.isdir(path):
+        return [path]
+    filenames = []
+    for dirpath, dirnames, files in os.walk(path):
+        dirnames.sort()
+        filenames += [os.path.join(dirpath, f) for f in sorted(files)]
+    return filenames
+
+def parse_records(filename, formats=None):
+    """
+    Parsed records of a file, [] if its format is unknown: one ParseDF038
+    per DATA record with the spectra decoded for DF038, the parsed file
+    otherwise
+    """
+    code = sniff_format(filename)
+    if code is None or (formats and code not in formats):
+        return []
+    if code == 'DF038':
+        return read_records(filename)
+    return [PARSERS[code](filename)]
+
+def _parse_chunk(filenames, formats=None):
+    # decoding happens here, in the worker, not when the parent reads them
+    parsed = []
+    for filename in filenames:
+        parsed += parse_records(filename, formats)
+    return parsed
+
+def _init_profiled_worker(allocations):
+    # forked workers start with a copy of the parent's stats
+    profiling.reset()
+    profiling.enable(allocations)
+
+def _parse_chunk_profiled(filenames, formats=None):
+    # parsed objects and the stats recorded since the last chunk
+    parsed = _parse_chunk(filenames, formats)
+    stats = profiling.get_stats()
+    profiling.reset()
+    return parsed, stats
+
+def ingest(path, workers=None, chunksize=64, formats=None):
+    """
+    Parse every recognised Miros file below path:
+    - workers: number of processes, None for one per core, 1 to parse in
+      this process
+    - chunksize: files handed to a worker per task
+    - formats: optional collection of format codes to keep (e.g. ['DF022'])
+    - returns the parsed objects sorted by record time, one per DATA
+      record of DF038 files with the spectra decoded by the workers
+    """
+    filenames = find_files(path)
+    parse_chunk = functools.partial(_parse_chunk, formats=formats)
+    chunks = [filenames[i:i+chunksize]
+              for i in range(0, len(filenames), chunksize)]
+    parsed = []
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            parsed += parse_chunk(chunk)
+    elif profiling.is_enabled():
+        parse_chunk = functools.partial(_parse_chunk_profiled, formats=formats)
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=_init_profiled_worker,
+                initargs=(profiling.traces_allocations(),)) as pool:
+            for chunk_parsed, stats in pool.map(parse_chunk, chunks):
+                parsed += chunk_parsed
+                profiling.merge(stats)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            for chunk_parsed in pool.map(parse_chunk, chunks):
+                parsed += chunk_parsed
+    parsed.sort(key=record_time)
+    return parsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Parse Miros data files below a directory')
+    parser.add_argument('path', help='file or directory to ingest')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--chunksize', type=int, default=64,
+                        help='files per worker task')
+    parser.add_argument('--format', dest='formats', action='append',
+                        choices=sorted(PARSERS), help='only ingest this format')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-stage timings to stderr')
+    parser.add_argument('--profile-allocations', action='store_true',
+                        help='with --profile, also trace allocations (slow)')
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiling.enable(args.profile_allocations)
+    for data in ingest(args.path, args.workers, args.chunksize, args.formats):
+        print('%s %s %s %s' % (record_time(data).isoformat(),
+                               type(data).__name__[5:], record_site(data),
+                               data.filename))
+    if args.profile:
+        profiling.disable()
+        print(profiling.report(), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()